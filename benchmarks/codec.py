@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+'''
+    codec
+
+    Checks that the codecs of magento.codec encode requests and decode
+    responses exactly like xmlrpc.client on a corpus of messages, then
+    measures how fast each codec is.
+
+    Usage::
+
+        python benchmarks/codec.py --attributes 50 --repeat 200
+
+    :license: BSD, see LICENSE for more details
+'''
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+from xmlrpc.client import Binary, DateTime, Fault, dumps
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from magento.codec import Codec, FastCodec  # noqa
+
+import mock_magento  # noqa
+
+
+def corpus(attributes):
+    """
+    Return the values of the corpus, as sent in requests or returned in
+    responses
+    """
+    magento = mock_magento.MockMagento(attributes=attributes, orders=100)
+    values = [
+        [],
+        [None],
+        [1, -1, 0, 2 ** 31 - 1, True, False, 1.5, -0.0, 1e100],
+        ['', 'plain', 'a & b < c > d', u'unicodé ✓', '\n\t spaces \n'],
+        [{}, {'': ''}, {'a&b': '<tag>'}, [[], [[]], {'k': [{'n': None}]}]],
+        [DateTime('20260101T10:20:30'), Binary(b'\x00\x01binary')],
+        ['catalog_product.info', [1, None, None, 'sku']],
+        [magento.product(1)],
+        [magento.r_sales_order_list()],
+        [magento.r_catalog_product_list()[:100]],
+    ]
+    return values
+
+
+def normalize(value):
+    """
+    Return a comparable form of a decoded value, since `DateTime` and
+    `Binary` do not compare by value in every python version
+    """
+    if isinstance(value, DateTime):
+        return ('DateTime', value.value)
+    if isinstance(value, Binary):
+        return ('Binary', value.data)
+    if isinstance(value, (list, tuple)):
+        return [normalize(item) for item in value]
+    if isinstance(value, dict):
+        return dict((key, normalize(item)) for key, item in value.items())
+    return (type(value).__name__, value)
+
+
+def check(codecs, values):
+    """
+    Compare the requests and responses of every codec to the ones of
+    xmlrpc.client
+    """
+    stdlib = Codec()
+    for params in values:
+        params = tuple(params)
+        request = stdlib.dumps(params, 'call')
+        response = dumps(
+            (list(params),), methodresponse=True, allow_none=True
+        ).encode('utf-8')
+        expected = normalize(stdlib.loads(response))
+        for codec in codecs:
+            assert codec.dumps(params, 'call') == request, \
+                '%s encodes %r differently' % (codec.name, params)
+            assert normalize(codec.loads(response)) == expected, \
+                '%s decodes %r differently' % (codec.name, params)
+    fault = dumps(Fault(5, 'Session expired'), allow_none=True)
+    for codec in codecs:
+        try:
+            codec.loads(fault.encode('utf-8'))
+        except Fault as exc:
+            assert (exc.faultCode, exc.faultString) == (5, 'Session expired')
+        else:
+            raise AssertionError('%s does not raise faults' % codec.name)
+    dated = dumps((DateTime('20260101T10:20:30'),), methodresponse=True)
+    assert FastCodec(True).loads(dated.encode('utf-8')) == \
+        (datetime(2026, 1, 1, 10, 20, 30),)
+
+
+def measure(function, repeat):
+    start = time.perf_counter()
+    for index in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[3])
+    parser.add_argument('--attributes', type=int, default=50,
+                        help='Extra attributes per product')
+    parser.add_argument('--products', type=int, default=200,
+                        help='Products per message')
+    parser.add_argument('--repeat', type=int, default=100)
+    args = parser.parse_args()
+
+    codecs = [Codec(), FastCodec()]
+    check(codecs[1:], corpus(args.attributes))
+    print('%s encodes and decodes like xmlrpc.client' % codecs[1].name)
+
+    magento = mock_magento.MockMagento(attributes=args.attributes)
+    products = [
+        magento.product(index) for index in range(1, args.products + 1)
+    ]
+    params = ('session', 'catalog_product.multi', products)
+    response = dumps((products,), methodresponse=True).encode('utf-8')
+    print('%-10s %12s %12s' % ('codec', 'encode ms', 'decode ms'))
+    timings = {}
+    for codec in codecs:
+        timings[codec.name] = (
+            measure(lambda: codec.dumps(params, 'call'), args.repeat),
+            measure(lambda: codec.loads(response), args.repeat),
+        )
+        print('%-10s %12.2f %12.2f' % (
+            (codec.name,) + timings[codec.name]
+        ))
+    base, fast = timings['stdlib'], timings[codecs[1].name]
+    print('speedup    %11.1fx %11.1fx' % (
+        base[0] / fast[0], base[1] / fast[1]
+    ))
+
+
+if __name__ == '__main__':
+    main()
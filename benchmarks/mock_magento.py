@@ -0,0 +1,454 @@
+# -*- coding: utf-8 -*-
+'''
+    mock_magento
+
+    A local stand-in for a magento server, speaking enough of the xmlrpc
+    and REST APIs for the client to be exercised and measured without a
+    real store.
+
+    Run it on its own with::
+
+        python benchmarks/mock_magento.py --port 8069 --latency 0.01
+
+    :license: BSD, see LICENSE for more details
+'''
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, urlsplit
+from xmlrpc.client import Fault, dumps, loads
+
+XMLRPC_PATH = '/index.php/api/xmlrpc'
+REST_PATH = '/index.php/rest/V1/'
+BULK_PATH = '/index.php/rest/async/bulk/V1/'
+
+
+class MockMagento(object):
+    """
+    The state and behaviour of the mock store.
+
+    :param products: Number of products in the catalog
+    :param orders: Number of orders
+    :param attributes: Number of extra attributes in a product record,
+                       which controls the payload size
+    :param latency: Seconds every request is delayed by
+    :param jitter: Maximum random seconds added to the latency
+    :param fault_rate: Probability for a call to fail with a fault
+    :param session_lifetime: Seconds after which sessions expire, None for
+                             sessions which never expire
+    :param bulk_delay: Seconds the operations of a bulk request stay open
+    """
+
+    def __init__(self, products=1000, orders=5000, attributes=20,
+                 latency=0.0, jitter=0.0, fault_rate=0.0,
+                 session_lifetime=None, bulk_delay=0.0):
+        self.products = products
+        self.orders = orders
+        self.attributes = attributes
+        self.latency = latency
+        self.jitter = jitter
+        self.fault_rate = fault_rate
+        self.session_lifetime = session_lifetime
+        self.bulk_delay = bulk_delay
+        self.sessions = {}
+        self.bulks = {}
+        self.operation_ids = 0
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'logins': 0, 'calls': 0}
+
+    def delay(self):
+        if self.latency or self.jitter:
+            time.sleep(self.latency + random.random() * self.jitter)
+
+    def count(self, key, value=1):
+        with self.lock:
+            self.stats[key] += value
+
+    # xmlrpc methods
+
+    def login(self, username, password):
+        self.count('logins')
+        session = '%032x' % random.getrandbits(128)
+        with self.lock:
+            self.sessions[session] = time.time()
+        return session
+
+    def endSession(self, session):
+        with self.lock:
+            self.sessions.pop(session, None)
+        return True
+
+    def check_session(self, session):
+        with self.lock:
+            started = self.sessions.get(session)
+        if started is None or (
+                self.session_lifetime is not None and
+                time.time() - started > self.session_lifetime):
+            raise Fault(5, 'Session expired. Try to relogin.')
+
+    def call(self, session, resource_path, arguments):
+        self.check_session(session)
+        self.count('calls')
+        return self.dispatch(resource_path, arguments)
+
+    def multiCall(self, session, calls):
+        self.check_session(session)
+        self.count('calls', len(calls))
+        results = []
+        for resource_path, arguments in calls:
+            try:
+                results.append(self.dispatch(resource_path, arguments))
+            except Fault as fault:
+                results.append({
+                    'isFault': True,
+                    'faultCode': fault.faultCode,
+                    'faultMessage': fault.faultString,
+                })
+        return results
+
+    # resources
+
+    def dispatch(self, resource_path, arguments):
+        if self.fault_rate and random.random() < self.fault_rate:
+            raise Fault(1, 'Internal Error. Please see log for details.')
+        method = getattr(
+            self, 'r_' + resource_path.replace('.', '_'), None
+        )
+        if method is None:
+            return True
+        return method(*(arguments or []))
+
+    def product(self, product_id):
+        product_id = int(product_id)
+        if not 0 < product_id <= self.products:
+            raise Fault(101, 'Product not exists.')
+        record = {
+            'product_id': str(product_id),
+            'sku': 'SKU-%06d' % product_id,
+            'set': '4',
+            'type': 'simple',
+            'name': 'Product %d' % product_id,
+            'price': '%d.9900' % (product_id % 500),
+            'status': '1',
+            'visibility': '4',
+            'category_ids': ['2', str(3 + product_id % 10)],
+            'updated_at': '2026-01-01 00:00:00',
+        }
+        for index in range(self.attributes):
+            record['attribute_%d' % index] = 'value %d of %d' % (
+                index, product_id
+            )
+        return record
+
+    def r_catalog_product_info(self, product, *args):
+        if isinstance(product, str) and product.startswith('SKU-'):
+            product = product[4:]
+        return self.product(product)
+
+    def r_catalog_product_list(self, filters=None, store_view=None):
+        # Like magento 1, updated_at is not returned but can be filtered
+        # on. Every product was updated at the same time.
+        since = ((filters or {}).get('updated_at') or {}).get('from')
+        if since and since > '2026-01-01 00:00:00':
+            return []
+        return [
+            {
+                'product_id': str(product_id),
+                'sku': 'SKU-%06d' % product_id,
+                'name': 'Product %d' % product_id,
+                'set': '4',
+                'type': 'simple',
+                'category_ids': ['2'],
+            }
+            for product_id in range(1, self.products + 1)
+        ]
+
+    def r_cataloginventory_stock_item_list(self, products):
+        # Products are given by ID or SKU, and unknown ones are left out
+        items = []
+        for product in products:
+            if isinstance(product, str) and product.startswith('SKU-'):
+                product = product[4:]
+            try:
+                product_id = int(product)
+            except ValueError:
+                continue
+            if not 0 < product_id <= self.products:
+                continue
+            items.append({
+                'product_id': str(product_id),
+                'sku': 'SKU-%06d' % product_id,
+                'qty': '%d.0000' % (product_id % 100),
+                'is_in_stock': '1',
+            })
+        return items
+
+    def r_cataloginventory_stock_item_update(self, product, data):
+        return True
+
+    def order(self, order_id):
+        return {
+            'order_id': str(order_id),
+            'increment_id': '1%08d' % order_id,
+            'status': ('pending', 'processing', 'complete')[order_id % 3],
+            'grand_total': '%d.5000' % (order_id % 1000),
+            'customer_email': 'customer%d@example.com' % (order_id % 97),
+            'created_at': '2026-01-01 00:00:00',
+            'updated_at': '2026-01-01 00:00:00',
+        }
+
+    def r_sales_order_list(self, filters=None):
+        return [self.order(i) for i in range(1, self.orders + 1)]
+
+    def r_sales_order_search(self, options):
+        limit = options.get('limit') or 1000
+        start = (options.get('page', 1) - 1) * limit + 1
+        return [
+            self.order(i)
+            for i in range(start, min(start + limit, self.orders + 1))
+        ]
+
+    def r_sales_order_info(self, increment_id):
+        return self.order(int(increment_id) - 100000000)
+
+    # REST
+
+    def bulk(self, method, path, payloads):
+        """
+        Accept a bulk request. Payloads which are not objects are
+        rejected, and the operations updating the stock of unknown
+        products fail.
+        """
+        self.count('calls')
+        bulk_uuid = '%032x' % random.getrandbits(128)
+        items, operations = [], []
+        for index, payload in enumerate(payloads or []):
+            if not isinstance(payload, dict):
+                items.append({
+                    'id': index, 'status': 'rejected',
+                    'error_message': 'Payload is not an object',
+                })
+                continue
+            items.append({'id': index, 'status': 'accepted'})
+            status, message = 1, 'Done'
+            if 'productSku' in payload:
+                try:
+                    self.product(str(payload['productSku'])[4:])
+                except (Fault, ValueError):
+                    status, message = 3, 'Product not exists.'
+            with self.lock:
+                self.operation_ids += 1
+                operation_id = self.operation_ids
+            operations.append({
+                'id': operation_id, 'operation_key': index,
+                'status': status, 'result_message': message,
+                'error_code': status == 3 and 101 or None,
+            })
+        with self.lock:
+            self.bulks[bulk_uuid] = (
+                time.time() + self.bulk_delay, operations
+            )
+        return 202, {
+            'bulk_uuid': bulk_uuid, 'request_items': items,
+            'errors': any(item['status'] == 'rejected' for item in items),
+        }
+
+    def bulk_status(self, bulk_uuid, status=None):
+        with self.lock:
+            bulk = self.bulks.get(bulk_uuid)
+        if bulk is None:
+            return 404, {'message': 'Bulk not found.'}
+        done_at, operations = bulk
+        if time.time() < done_at:
+            operations = [
+                dict(operation, status=4, result_message=None)
+                for operation in operations
+            ]
+        if status is None:
+            return 200, {
+                'bulk_id': bulk_uuid, 'operations_list': operations,
+            }
+        return 200, len([
+            operation for operation in operations
+            if operation['status'] == status
+        ])
+
+    def rest(self, method, path, params, body):
+        self.count('calls')
+        if self.fault_rate and random.random() < self.fault_rate:
+            return 500, {'message': 'Internal Error'}
+        parts = path.split('/')
+        if parts[0] == 'bulk' and len(parts) >= 3 and method == 'GET':
+            if parts[2] == 'detailed-status':
+                return self.bulk_status(parts[1])
+            if parts[2] == 'operation-status' and len(parts) == 4:
+                return self.bulk_status(parts[1], int(parts[3]))
+        if parts[0] == 'products' and len(parts) == 2 and method == 'GET':
+            try:
+                return 200, self.product(parts[1].replace('SKU-', ''))
+            except Fault as fault:
+                return 404, {'message': fault.faultString}
+        if parts[0] == 'products' and len(parts) == 4 and \
+                parts[2] == 'stockItems' and method == 'PUT':
+            try:
+                self.product(parts[1].replace('SKU-', ''))
+            except (Fault, ValueError):
+                return 404, {'message': 'Product not exists.'}
+            return 200, 1
+        prefix = 'searchCriteria[filter_groups][0][filters][0]'
+        if parts == ['orders'] and method == 'GET' and \
+                params.get(prefix + '[field]') == ['increment_id']:
+            order_id = int(params[prefix + '[value]'][0]) - 100000000
+            items = []
+            if 0 < order_id <= self.orders:
+                items.append(self.order(order_id))
+            return 200, {'items': items, 'total_count': len(items)}
+        if parts[0] in ('products', 'orders') and len(parts) == 1 and \
+                method == 'GET':
+            total = parts[0] == 'products' and self.products or self.orders
+            size = int(params.get('searchCriteria[pageSize]', [total])[0])
+            page = int(params.get('searchCriteria[currentPage]', [1])[0])
+            start = (page - 1) * size + 1
+            record = parts[0] == 'products' and self.product or self.order
+            return 200, {
+                'items': [
+                    record(i)
+                    for i in range(start, min(start + size, total + 1))
+                ],
+                'total_count': total,
+            }
+        if method == 'GET':
+            return 200, []
+        return 200, body if body is not None else True
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class Handler(BaseHTTPRequestHandler):
+    """
+    Serves the xmlrpc and REST requests of a :class:`MockMagento`
+    """
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately, which without this would
+    # stall every response on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def respond(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length)
+
+    def do_POST(self):
+        magento = self.server.magento
+        magento.count('requests')
+        magento.delay()
+        if not self.path.startswith(XMLRPC_PATH):
+            return self.handle_rest('POST')
+        params, method = loads(self.read_body())
+        try:
+            result = getattr(magento, method)(*params)
+            body = dumps((result,), methodresponse=True, allow_none=True)
+        except Fault as fault:
+            body = dumps(fault, allow_none=True)
+        self.respond(200, body.encode('utf-8'), 'text/xml')
+
+    def do_GET(self):
+        magento = self.server.magento
+        magento.count('requests')
+        magento.delay()
+        self.handle_rest('GET')
+
+    def do_PUT(self):
+        magento = self.server.magento
+        magento.count('requests')
+        magento.delay()
+        self.handle_rest('PUT')
+
+    def do_DELETE(self):
+        magento = self.server.magento
+        magento.count('requests')
+        magento.delay()
+        self.handle_rest('DELETE')
+
+    def handle_rest(self, method):
+        url = urlsplit(self.path)
+        body = None
+        if method in ('POST', 'PUT'):
+            body = json.loads(self.read_body() or b'null')
+        if url.path.startswith(BULK_PATH) and method in ('POST', 'PUT'):
+            status, result = self.server.magento.bulk(
+                method, url.path[len(BULK_PATH):], body
+            )
+        elif url.path.startswith(REST_PATH):
+            status, result = self.server.magento.rest(
+                method, url.path[len(REST_PATH):], parse_qs(url.query),
+                body
+            )
+        else:
+            return self.respond(404, b'', 'text/plain')
+        self.respond(
+            status, json.dumps(result).encode('utf-8'), 'application/json'
+        )
+
+
+def serve(magento=None, host='127.0.0.1', port=0):
+    """
+    Start a mock server in a daemon thread and return its base URL and
+    the server. `server.magento` is the :class:`MockMagento` it serves.
+
+    :param magento: :class:`MockMagento`, a default one if None
+    :param host: Address to listen on
+    :param port: Port to listen on, 0 for any free port
+    """
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.magento = magento or MockMagento()
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return 'http://%s:%d/' % server.server_address[:2], server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[3])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8069)
+    parser.add_argument('--products', type=int, default=1000)
+    parser.add_argument('--orders', type=int, default=5000)
+    parser.add_argument('--attributes', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--fault-rate', type=float, default=0.0)
+    parser.add_argument('--session-lifetime', type=float, default=None)
+    parser.add_argument('--bulk-delay', type=float, default=0.0)
+    args = parser.parse_args()
+    url, server = serve(MockMagento(
+        args.products, args.orders, args.attributes, args.latency,
+        args.jitter, args.fault_rate, args.session_lifetime,
+        args.bulk_delay,
+    ), args.host, args.port)
+    print('Mock magento listening on %s' % url)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
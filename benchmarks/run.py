@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+'''
+    run
+
+    Benchmarks of the magento client against the local mock server of
+    mock_magento.py. Every benchmark reports calls per second, the 50th
+    and 99th percentile latency of an operation and the peak of memory
+    allocated by python while it runs.
+
+    Usage::
+
+        python benchmarks/run.py --latency 0.005 --json results.json
+        python benchmarks/run.py --compare results.json
+
+    :license: BSD, see LICENSE for more details
+'''
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import magento  # noqa
+from magento.api import API  # noqa
+
+import mock_magento  # noqa
+
+#: Sub APIs touched by the startup benchmark
+STARTUP_APIS = [
+    magento.Product, magento.Inventory, magento.Order, magento.Customer,
+    magento.Category, magento.ProductAttribute, magento.ProductImages,
+    magento.ProductTierPrice, magento.ProductLinks, magento.Invoice,
+    magento.Shipment, magento.Store, magento.Country, magento.Region,
+    magento.CustomerGroup,
+]
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def serve_forever(queue, options):
+    url, server = mock_magento.serve(mock_magento.MockMagento(**options))
+    queue.put(url)
+    while True:
+        time.sleep(3600)
+
+
+def start_server(options):
+    """
+    Start the mock server in a separate process, so that it does not
+    compete with the client for the GIL, and return its URL
+    """
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(
+        target=serve_forever, args=(queue, options)
+    )
+    process.daemon = True
+    process.start()
+    return queue.get(timeout=30)
+
+
+class Benchmark(object):
+    """
+    A benchmark runs `operation` `repeat` times. An operation may make
+    more than one call, which is what `calls` tells.
+    """
+
+    def __init__(self, name, operation, repeat, calls=1, setup=None):
+        self.name = name
+        self.operation = operation
+        self.repeat = repeat
+        self.calls = calls
+        self.setup = setup
+
+    def run(self):
+        state = self.setup() if self.setup else None
+        latencies = []
+        started = time.perf_counter()
+        for index in range(self.repeat):
+            start = time.perf_counter()
+            self.operation(state, index)
+            latencies.append(time.perf_counter() - start)
+        elapsed = time.perf_counter() - started
+
+        # Memory is measured in a separate run since tracing allocations
+        # slows the code down
+        state = self.setup() if self.setup else None
+        gc.collect()
+        tracemalloc.start()
+        self.operation(state, 0)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        return {
+            'calls_per_sec': self.repeat * self.calls / elapsed,
+            'p50_ms': percentile(latencies, 0.5) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+            'peak_kb': peak / 1024.0,
+        }
+
+
+def benchmarks(url, args):
+    def client():
+        api = API(url, 'user', 'password', pool_maxsize=args.workers)
+        api.__enter__()
+        return api
+
+    def startup(api, index):
+        api = API(url, 'user', 'password')
+        for Klass in STARTUP_APIS:
+            api.get_instance_of(Klass)
+        api.get_instance_of(magento.Magento).info()
+
+    def product_info(api, index):
+        api.get_instance_of(magento.Product).info(
+            index % args.products + 1
+        )
+
+    def product_info_multi(api, index):
+        api.get_instance_of(magento.Product).info_multi(
+            range(1, args.batch + 1)
+        )
+
+    def inventory_update_multi(api, index):
+        api.get_instance_of(magento.Inventory).update_multi([
+            [product, {'qty': 10, 'is_in_stock': 1}]
+            for product in range(1, args.batch + 1)
+        ])
+
+    def product_list(api, index):
+        api.get_instance_of(magento.Product).list()
+
+    def product_iter_list(api, index):
+        for product in api.get_instance_of(magento.Product).iter_list():
+            pass
+
+    def order_search(api, index):
+        for order in api.get_instance_of(magento.Order).iter_search(
+                page_size=args.page_size):
+            pass
+
+    def order_search_prefetch(api, index):
+        for order in api.get_instance_of(magento.Order).iter_search(
+                page_size=args.page_size, prefetch=True):
+            pass
+
+    return [
+        Benchmark('get_instance_of startup', startup, args.repeat // 10 or 1),
+        Benchmark('Product.info', product_info, args.repeat, setup=client),
+        Benchmark(
+            'Product.info_multi', product_info_multi,
+            args.repeat // 10 or 1, args.batch, client,
+        ),
+        Benchmark(
+            'Inventory.update_multi', inventory_update_multi,
+            args.repeat // 10 or 1, args.batch, client,
+        ),
+        Benchmark(
+            'Product.list', product_list, args.repeat // 100 or 1,
+            setup=client,
+        ),
+        Benchmark(
+            'Product.iter_list', product_iter_list, args.repeat // 100 or 1,
+            setup=client,
+        ),
+        Benchmark(
+            'Order.iter_search', order_search, args.repeat // 100 or 1,
+            -(-args.orders // args.page_size), client,
+        ),
+        Benchmark(
+            'Order.iter_search prefetch', order_search_prefetch,
+            args.repeat // 100 or 1, -(-args.orders // args.page_size),
+            client,
+        ),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[3])
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='Seconds of latency of the mock server')
+    parser.add_argument('--attributes', type=int, default=20,
+                        help='Extra attributes per product')
+    parser.add_argument('--products', type=int, default=1000)
+    parser.add_argument('--orders', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=500,
+                        help='Number of operations per benchmark')
+    parser.add_argument('--batch', type=int, default=200,
+                        help='Calls per *_multi operation')
+    parser.add_argument('--page-size', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=10)
+    parser.add_argument('--only', help='Only run benchmarks whose name '
+                        'contains this text')
+    parser.add_argument('--json', help='Save the results to this file')
+    parser.add_argument('--compare', help='Compare to results saved '
+                        'by an earlier run with --json')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='Slowdown reported as a regression')
+    args = parser.parse_args()
+
+    url = start_server({
+        'products': args.products,
+        'orders': args.orders,
+        'attributes': args.attributes,
+        'latency': args.latency,
+    })
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as fileobj:
+            baseline = json.load(fileobj)
+
+    results = {}
+    print('%-28s %12s %10s %10s %12s' % (
+        'benchmark', 'calls/sec', 'p50 ms', 'p99 ms', 'peak KiB'
+    ))
+    regressions = 0
+    for benchmark in benchmarks(url, args):
+        if args.only and args.only not in benchmark.name:
+            continue
+        result = results[benchmark.name] = benchmark.run()
+        line = '%-28s %12.1f %10.2f %10.2f %12.1f' % (
+            benchmark.name, result['calls_per_sec'], result['p50_ms'],
+            result['p99_ms'], result['peak_kb'],
+        )
+        previous = baseline.get(benchmark.name)
+        if previous:
+            change = result['calls_per_sec'] / previous['calls_per_sec'] - 1
+            line += '  %+6.1f%%' % (change * 100)
+            if change < -args.threshold:
+                line += '  REGRESSION'
+                regressions += 1
+        print(line)
+
+    if args.json:
+        with open(args.json, 'w') as fileobj:
+            json.dump(results, fileobj, indent=2, sort_keys=True)
+    return regressions and 1 or 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,6 +4,8 @@
 
     :license: BSD, see LICENSE for more details
 '''
+import sys
+
 __all__ = [
             'API', 'Store', 'Magento',
             'Customer', 'CustomerGroup', 'CustomerAddress',
@@ -29,3 +31,7 @@ from .catalog import ProductTypes, ProductImages, ProductTierPrice
 from .catalog import ProductLinks, ProductConfigurable, Inventory
 from .sales import Order, Shipment, Invoice
 from .version import VERSION as __version__
+
+if sys.version_info >= (3, 5):
+    from .aio import AsyncAPI
+    __all__.append('AsyncAPI')
@@ -0,0 +1,413 @@
+# -*- coding: utf-8 -*-
+'''
+    magento.aio
+
+    asyncio API for magento, over the HTTP client of aiohttp
+
+    :license: BSD, see LICENSE for more details
+'''
+import asyncio
+import functools
+from collections.abc import Iterator
+from xmlrpc.client import ProtocolError
+
+from magento import rest
+from magento.api import Deferred, Fault, REST_SEARCHES
+from magento.api import get_api_class, get_fault, is_session_expired
+from magento.codec import get_codec
+from magento.utils import expand_url
+
+#: Protocols of :class:`AsyncAPI`
+PROTOCOLS = ('xmlrpc', 'rest')
+
+
+class AsyncAPI(object):
+    """
+    asyncio counterpart of :class:`magento.api.API`, which needs aiohttp
+    (`pip install magento[aio]`).
+
+    All the APIs available on :class:`magento.api.API` are available with
+    the same name and methods, but the methods are coroutines::
+
+        from magento.aio import AsyncAPI
+
+        async with AsyncAPI(url, username, password) as magento_api:
+            products = await asyncio.gather(*[
+                magento_api.product.info(sku) for sku in skus
+            ])
+
+    Requests are sent by a single `aiohttp.ClientSession`, on the event
+    loop, and an `asyncio.Semaphore` keeps at most `concurrency` of them in
+    flight, so that hundreds of calls can be awaited at once without
+    flooding magento. The connections are kept alive and reused.
+
+    Unlike :class:`magento.api.API`, there is no cache, observer, retry
+    policy or rate limiter, and the REST protocol does not use bulk
+    requests.
+    """
+
+    #: Default number of calls sent in one request by :meth:`multiCall`
+    multicall_chunk_size = 200
+
+    #: Number of records fetched per request by the list calls of the
+    #: REST protocol
+    rest_page_size = 100
+
+    def __init__(self, url, username, password, version='1.3.2.4',
+                 full_url=False, protocol='xmlrpc', verify_ssl=True,
+                 concurrency=100, codec=None):
+        """
+        :param url: URL to the magento instance, see
+                    :class:`magento.api.API`
+        :param username: API username of the Web services user
+        :param password: API password of the Web services user, or the
+                         authentication token for the REST protocol
+        :param version: The version of magento
+        :param full_url: If set to true, then the `url` is expected to
+                         be a complete URL
+        :param protocol: 'xmlrpc' or 'rest'
+        :param verify_ssl: skip SSL validation if False
+        :param concurrency: Maximum number of requests in flight
+        :param codec: :class:`magento.codec.Codec` of the xmlrpc messages,
+                      by default the fastest codec available
+        """
+        assert protocol \
+            in PROTOCOLS, "protocol must be %s" % ' OR '.join(PROTOCOLS)
+        self.url = str(full_url and url or expand_url(url, protocol))
+        self.username = username
+        self.password = password
+        self.version = version
+        self.protocol = protocol
+        self.verify_ssl = verify_ssl
+        self.concurrency = concurrency
+        self.codec = codec or get_codec()
+        self.session = None
+        self.semaphore = None
+        self.login_lock = None
+        self.token = None
+
+    def connect(self):
+        """
+        Open the HTTP session. Must be called from the event loop the
+        API is used on, which it does on first use.
+        """
+        import aiohttp
+
+        headers = {}
+        if self.protocol == 'rest':
+            headers['Authorization'] = 'Bearer %s' % self.password
+        else:
+            headers['Content-Type'] = 'text/xml'
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=self.concurrency,
+                ssl=None if self.verify_ssl else False,
+            ),
+            headers=headers,
+        )
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        self.login_lock = asyncio.Lock()
+
+    async def close(self):
+        """
+        End the magento session and close the connections
+        """
+        if self.session is None:
+            return
+        try:
+            if self.token is not None:
+                token, self.token = self.token, None
+                await self._xmlrpc('endSession', (token,))
+        finally:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        """
+        Entry point for async with statement
+        Logs in and creates a session
+        """
+        if self.session is None:
+            self.connect()
+        if self.protocol == 'xmlrpc':
+            await self._get_token()
+        return self
+
+    async def __aexit__(self, type, value, traceback):
+        """
+        Exit point
+
+        Closes session with magento and the connections
+        """
+        await self.close()
+
+    async def _xmlrpc(self, methodname, params):
+        """
+        Send an xmlrpc request and return its decoded response
+        """
+        body = self.codec.dumps(params, methodname)
+        async with self.semaphore:
+            async with self.session.post(self.url, data=body) as response:
+                data = await response.read()
+                if response.status != 200:
+                    raise ProtocolError(
+                        self.url, response.status, response.reason,
+                        response.headers,
+                    )
+        result = self.codec.loads(data)
+        if len(result) == 1:
+            result = result[0]
+        return result
+
+    async def _rest(self, resource_path, arguments):
+        """
+        Send a request to the REST API and return its decoded response.
+        Errors magento reports for the request, with a 4xx status, are
+        raised as a `Fault` with the status as code.
+        """
+        method, path = rest.split_method(resource_path)
+        if method in ('GET', 'DELETE'):
+            options = {'params': arguments}
+        else:
+            options = {'json': arguments}
+        async with self.semaphore:
+            async with self.session.request(
+                    method, rest.url_for(self.url, path),
+                    **options) as response:
+                if 400 <= response.status < 500:
+                    try:
+                        message = (
+                            await response.json(content_type=None)
+                        ).get('message')
+                    except (ValueError, AttributeError):
+                        message = None
+                    raise Fault(
+                        response.status, message or response.reason or ''
+                    )
+                response.raise_for_status()
+                if not await response.read():
+                    return None
+                return await response.json(content_type=None)
+
+    async def _get_token(self):
+        """
+        Return the magento session id, logging in if needed. Concurrent
+        calls wait for a single login.
+        """
+        async with self.login_lock:
+            if self.token is None:
+                self.token = await self._xmlrpc(
+                    'login', (self.username, self.password)
+                )
+            return self.token
+
+    async def _call_with_session(self, methodname, *args):
+        """
+        Call an xmlrpc method with the session id followed by `args`,
+        logging in again once if magento reports the session expired
+        """
+        token = await self._get_token()
+        try:
+            return await self._xmlrpc(methodname, (token,) + args)
+        except Fault as exc:
+            if not is_session_expired(exc):
+                raise
+        async with self.login_lock:
+            if self.token == token:
+                self.token = None
+        return await self._xmlrpc(
+            methodname, (await self._get_token(),) + args
+        )
+
+    async def call(self, resource_path, arguments):
+        """
+        Make a call to magento and return its result
+
+        With the REST protocol, the calls of magento 1 are translated like
+        :meth:`magento.api.API.call` does.
+        """
+        if self.session is None:
+            self.connect()
+        if self.protocol == 'xmlrpc':
+            return await self._call_with_session(
+                'call', resource_path, arguments
+            )
+        if resource_path in REST_SEARCHES:
+            return await self.search(
+                REST_SEARCHES[resource_path], arguments and arguments[0]
+            )
+        path, arguments, convert = rest.translate(resource_path, arguments)
+        result = await self._rest(path, arguments)
+        if convert is not None:
+            result = convert(result)
+        return result
+
+    async def search(self, path, filters=None, page_size=None):
+        """
+        Return all the records of a search endpoint of the REST API, eg:
+        `products`. Once the first page tells how many records there are,
+        the other pages are fetched at once.
+
+        :param path: Path of the search endpoint
+        :param filters: `{<attribute>: {<operator>: <value>}}`
+        :param page_size: Number of records fetched per request, defaults
+                          to :attr:`rest_page_size`
+        """
+        page_size = page_size or self.rest_page_size
+
+        async def fetch_page(page):
+            result = await self._rest(path, rest.search_criteria(
+                filters, page_size, page
+            )) or {}
+            return result.get('items') or [], result.get('total_count')
+
+        records, total = await fetch_page(1)
+        if total is not None:
+            pages = -(-int(total) // page_size)
+            for items, _ in await asyncio.gather(*[
+                    fetch_page(page) for page in range(2, pages + 1)]):
+                records.extend(items)
+            return records
+        page = 1
+        items = records
+        while len(items) >= page_size:
+            page += 1
+            items, _ = await fetch_page(page)
+            records.extend(items)
+        return records
+
+    async def multiCall(self, calls, chunk_size=None):
+        """
+        Make several calls and return a `list` aligned with `calls` of
+        their results, with a `Fault` in place of every call magento
+        failed, like :meth:`magento.api.API.multiCall`.
+
+        With xmlrpc, the calls are sent in multicalls of `chunk_size`
+        calls, all at once. With REST, every call is a request of its
+        own.
+
+        :param calls: List of `[resource_path, arguments]` pairs
+        :param chunk_size: Number of calls per request, defaults to
+                           :attr:`multicall_chunk_size`
+        """
+        if self.session is None:
+            self.connect()
+        if self.protocol == 'rest':
+            for resource_path, arguments in calls:
+                # Raises the error of the calls which cannot be sent at all
+                rest.translate(resource_path, arguments)
+            return await self.call_parallel(calls)
+        chunk_size = chunk_size or self.multicall_chunk_size
+        chunks = await asyncio.gather(*[
+            self._call_with_session(
+                'multiCall', calls[index:index + chunk_size]
+            )
+            for index in range(0, len(calls), chunk_size)
+        ])
+        return [
+            get_fault(result) or result
+            for chunk in chunks for result in chunk
+        ]
+
+    async def call_parallel(self, calls):
+        """
+        Make several calls at once, each a request of its own, and return
+        a `list` aligned with `calls` of their results, with the exception
+        raised in place of every failed call
+
+        :param calls: List of `[resource_path, arguments]` pairs
+        """
+        return list(await asyncio.gather(*[
+            self.call(resource_path, arguments)
+            for resource_path, arguments in calls
+        ], return_exceptions=True))
+
+    def __getattr__(self, name):
+        Klass = get_api_class(name)
+        if Klass is None:
+            raise AttributeError(name)
+        value = AsyncResource(self, Klass)
+        setattr(self, name, value)
+        return value
+
+
+class AsyncResource(object):
+    """
+    Makes the methods of a sub API coroutines making their calls with an
+    :class:`AsyncAPI`.
+
+    The method of the sub API is run until it calls magento, the call is
+    awaited, and the method is run again from the start with that result,
+    until it returns. Its calls go through `call`, `multiCall`,
+    `call_parallel` and `iter_call`, the latter getting the whole list.
+    Methods returning an iterator, like `iter_list`, give a `list`.
+    """
+
+    def __init__(self, async_api, Klass):
+        """
+        :param async_api: The :class:`AsyncAPI` making the calls
+        :param Klass: The class of the sub API, eg: `magento.Product`
+        """
+        self.async_api = async_api
+        self.Klass = Klass
+        self.template = None
+
+    def bind(self, results):
+        """
+        Return an instance of the sub API whose calls return the given
+        results in turn, and then raise :class:`magento.api.Deferred` with
+        the awaitable of the next call
+        """
+        if self.template is None:
+            api = self.async_api
+            self.template = self.Klass(
+                api.url, api.username, api.password, api.version, True,
+                api.protocol,
+            )
+        resource = self.Klass.__new__(self.Klass)
+        resource.__dict__.update(self.template.__dict__)
+        results = iter(results)
+
+        def defer(request):
+            def replay(*args, **kwargs):
+                for result in results:
+                    return result
+                raise Deferred(request(*args, **kwargs))
+            return replay
+
+        async_api = self.async_api
+        resource.call = defer(async_api.call)
+        resource.call_parallel = defer(
+            lambda calls, workers=None: async_api.call_parallel(calls)
+        )
+        resource.multiCall = defer(
+            lambda calls, chunk_size=None, workers=1, retries=0:
+            async_api.multiCall(calls, chunk_size)
+        )
+        call = resource.call
+        resource.iter_call = lambda *args: iter(call(*args))
+
+        def unsupported(*args, **kwargs):
+            raise ValueError(
+                'Bulk requests are not supported by AsyncAPI'
+            )
+        resource.bulk = unsupported
+        return resource
+
+    def __getattr__(self, name):
+        method = getattr(self.Klass, name)
+        if not callable(method):
+            return method
+
+        @functools.wraps(method)
+        async def wrapper(*args, **kwargs):
+            results = []
+            while True:
+                try:
+                    result = method(self.bind(results), *args, **kwargs)
+                    if isinstance(result, Iterator):
+                        result = list(result)
+                    return result
+                except Deferred as deferred:
+                    results.append(await deferred.args[0])
+        return wrapper
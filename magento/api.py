@@ -6,15 +6,24 @@
 
     :license: BSD, see LICENSE for more details
 '''
+import ssl
 import sys
-from threading import RLock
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import chain
+from threading import Lock, RLock
+
+if sys.version_info < (3, 0):
+    from urlparse import urlsplit
+else:
+    from urllib.parse import urlsplit
 
 PROTOCOLS = []
 try:
     if sys.version_info < (3, 0):
-        from xmlrpclib import ServerProxy
+        from xmlrpclib import ServerProxy, Fault
     else:
-        from xmlrpc.client import ServerProxy
+        from xmlrpc.client import ServerProxy, Fault
 except ImportError:
     pass
 else:
@@ -36,8 +45,94 @@ except ImportError:
 else:
     PROTOCOLS.append('rest')
 
+from magento import codec as xmlrpc_codec
+from magento.cache import REFERENCE_DATA_PATHS, MISSING, cache_key
+from magento.metrics import CallEvent, exchange, record_retry
+from magento.metrics import start_exchange
+from magento.transport import PooledTransport
 from magento.utils import expand_url, camel_2_snake
 
+#: Search endpoints of the REST API which answer the list calls of
+#: magento 1, whose first argument is a `dict` of filters
+REST_SEARCHES = {
+    'catalog_product.list': 'products',
+    'customer.list': 'customers/search',
+    'sales_order.list': 'orders',
+}
+
+#: Fault code magento returns when the session id sent is no longer valid
+SESSION_EXPIRED = 5
+
+
+def is_session_expired(exc):
+    """
+    Check if the given exception is magento reporting that the session
+    used for the call has expired (or is otherwise invalid).
+
+    :param exc: Exception raised by the xmlrpc or soap client
+    """
+    fault_code = getattr(exc, 'faultCode', None)
+    if fault_code is None:
+        # suds raises a WebFault which wraps the actual fault
+        fault_code = getattr(getattr(exc, 'fault', None), 'faultcode', None)
+    return str(fault_code) == str(SESSION_EXPIRED)
+
+
+def get_fault(result):
+    """
+    Return the fault reported by magento for a single call of a multicall
+    as a `Fault`, or None if the call succeeded.
+
+    :param result: Item of the list returned by a multicall
+    """
+    if isinstance(result, dict) and result.get('isFault'):
+        return Fault(result.get('faultCode'), result.get('faultMessage'))
+    return None
+
+
+class LoginSession(object):
+    """
+    A magento session which is shared between an :class:`API` and all the
+    sub APIs created from it by :meth:`API.get_instance_of`.
+
+    The login happens lazily on first use. If magento reports that the
+    session expired, :meth:`renew` logs in again once and the new session
+    is picked up by every API sharing this object.
+    """
+
+    def __init__(self, login):
+        """
+        :param login: callable which logs in and returns a session id
+        """
+        self._login = login
+        self.token = None
+        self.lock = RLock()
+
+    def get(self):
+        """
+        Return the session id, logging in if there is no session yet
+        """
+        token = self.token
+        if token is None:
+            with self.lock:
+                if self.token is None:
+                    self.token = self._login()
+                token = self.token
+        return token
+
+    def renew(self, expired_token):
+        """
+        Login again because `expired_token` is no longer valid. If another
+        thread already renewed the session, its session id is returned
+        without logging in again.
+
+        :param expired_token: The session id that magento rejected
+        """
+        with self.lock:
+            if self.token is None or self.token == expired_token:
+                self.token = self._login()
+            return self.token
+
 
 class ClientApiMeta(type):
     """
@@ -67,7 +162,11 @@ class API(object):
     def __init__(self, url, username, password,
                  version='1.3.2.4', full_url=False,
                  protocol='xmlrpc', transport=None,
-                 verify_ssl=True):
+                 verify_ssl=True, pool_maxsize=10, pool_idle_timeout=60,
+                 cache=None, cached_paths=REFERENCE_DATA_PATHS,
+                 retry_policy=None, circuit_breaker=None,
+                 rate_limiter=None, codec=None, pool_connections=10,
+                 pool_block=False, max_retries=3, keep_alive=True):
         """
         This is the Base API class which other APIs have to subclass. By
         default the inherited classes also get the properties of this
@@ -131,8 +230,41 @@ class API(object):
                     be a complete URL
         :param protocol: 'xmlrpc' and 'soap' are valid values
         :param transport: optional xmlrpclib.Transport subclass for
-                    use in xmlrpc requests
-        :param verify_ssl: for REST API, skip SSL validation if False
+                    use in xmlrpc requests. By default a
+                    :class:`magento.transport.PooledTransport` is used
+        :param verify_ssl: skip SSL validation if False
+        :param pool_maxsize: Maximum number of connections kept open to
+                    magento by the default xmlrpc transport or the REST
+                    client
+        :param pool_idle_timeout: Seconds after which an idle connection
+                    of the default xmlrpc transport is closed
+        :param cache: Optional cache, eg: :class:`magento.cache.MemoryCache`
+                    in which the results of calls to `cached_paths` are
+                    kept
+        :param cached_paths: Resource paths whose results are cached.
+                    Defaults to paths returning reference data like the
+                    list of countries or attribute options
+        :param retry_policy: Optional :class:`magento.retry.RetryPolicy`
+                    to retry calls failing for transient reasons
+        :param circuit_breaker: Optional
+                    :class:`magento.retry.CircuitBreaker` to stop calling
+                    magento after consecutive failures
+        :param rate_limiter: Optional
+                    :class:`magento.ratelimit.RateLimiter` bounding the
+                    rate and concurrency of the requests to magento
+        :param codec: :class:`magento.codec.Codec` encoding and decoding
+                    the messages of the default xmlrpc transport. By
+                    default, the fastest codec available
+        :param pool_connections: Number of per host connection pools
+                    cached by the REST client
+        :param pool_block: If True, the REST client waits for a free
+                    connection instead of opening more than
+                    `pool_maxsize`
+        :param max_retries: Number of times the REST client retries
+                    failed connection attempts, or a
+                    `urllib3.util.Retry` instance
+        :param keep_alive: If False, the REST client closes the connection
+                    after every request
         """
         assert protocol \
             in PROTOCOLS, "protocol must be %s" % ' OR '.join(PROTOCOLS)
@@ -142,9 +274,22 @@ class API(object):
         self.protocol = protocol
         self.version = version
         self.transport = transport
-        self.session = None
+        self.login_session = None
         self.client = None
         self.verify_ssl = verify_ssl
+        self.pool_maxsize = pool_maxsize
+        self.pool_idle_timeout = pool_idle_timeout
+        self.cache = cache
+        self.cached_paths = cached_paths
+        self.observers = []
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
+        self.rate_limiter = rate_limiter
+        self.codec = codec
+        self.pool_connections = pool_connections
+        self.pool_block = pool_block
+        self.max_retries = max_retries
+        self.keep_alive = keep_alive
         self.lock = RLock()
 
     def connect(self):
@@ -153,33 +298,76 @@ class API(object):
         but does not login. This could be used as a connection test
         """
         if self.protocol == 'xmlrpc':
-            if self.transport:
+            if self.transport is None:
+                ssl_context = None
+                if not self.verify_ssl:
+                    ssl_context = ssl._create_unverified_context()
+                transport = PooledTransport(
+                    secure=self.url.startswith('https'),
+                    pool_maxsize=self.pool_maxsize,
+                    pool_idle_timeout=self.pool_idle_timeout,
+                    ssl_context=ssl_context,
+                    codec=self.codec or xmlrpc_codec.get_codec(),
+                )
+                self.client = xmlrpc_codec.ServerProxy(
+                    self.url, allow_none=True, transport=transport)
+            else:
                 self.client = ServerProxy(
                     self.url, allow_none=True, transport=self.transport)
-            else:
-                self.client = ServerProxy(self.url, allow_none=True)
         elif self.protocol == 'rest':
             # Use an authentication token as the password
             self.client = rest.Client(self.url, self.password,
-                                      verify_ssl=self.verify_ssl)
+                                      verify_ssl=self.verify_ssl,
+                                      pool_connections=self.pool_connections,
+                                      pool_maxsize=self.pool_maxsize,
+                                      pool_block=self.pool_block,
+                                      max_retries=self.max_retries,
+                                      keep_alive=self.keep_alive)
         else:
             self.client = Client(self.url)
 
-    def __enter__(self):
+    def _login(self):
         """
-        Entry point for with statement
-        Logs in and creates a session
+        Login to magento and return the session id
         """
-        if self.client is None:
-            self.connect()
         if self.protocol == 'xmlrpc':
-            self.session = self.client.login(
-                self.username, self.password)
+            return self.client.login(self.username, self.password)
         elif self.protocol == 'rest':
-            self.session = True
+            return True
         else:
-            self.session = self.client.service.login(
-                self.username, self.password)
+            return self.client.service.login(self.username, self.password)
+
+    def _get_login_session(self):
+        """
+        Return the login session of the API, connecting to the service
+        if that has not been done yet
+        """
+        with self.lock:
+            if self.client is None:
+                self.connect()
+            if self.login_session is None:
+                self.login_session = LoginSession(self._login)
+            return self.login_session
+
+    @property
+    def session(self):
+        """
+        The magento session id, None if not logged in
+        """
+        if self.login_session is None:
+            return None
+        return self.login_session.token
+
+    @session.setter
+    def session(self, value):
+        self._get_login_session().token = value
+
+    def __enter__(self):
+        """
+        Entry point for with statement
+        Logs in and creates a session
+        """
+        self._get_login_session().get()
         return self
 
     def __exit__(self, type, value, traceback):
@@ -188,41 +376,485 @@ class API(object):
 
         Closes session with magento
         """
+        if self.login_session is None or self.login_session.token is None:
+            return
         if self.protocol == 'xmlrpc':
-            self.client.endSession(self.session)
+            self.client.endSession(self.login_session.token)
         elif self.protocol == 'soap':
-            self.client.service.endSession(self.session)
-        self.session = None
+            self.client.service.endSession(self.login_session.token)
+        self.login_session.token = None
+
+    def _call_with_session(self, method, *args):
+        """
+        Call the remote `method` with the session id followed by `args`.
+        If magento reports that the session expired, the shared session is
+        renewed and the call is made once again.
+
+        :param method: Name of the xmlrpc/soap method, eg: `call`, or a
+                       function taking the same arguments as that method
+        """
+        login_session = self._get_login_session()
+        if callable(method):
+            pass
+        elif self.protocol == 'xmlrpc':
+            method = getattr(self.client, method)
+        else:
+            method = getattr(self.client.service, method)
+        token = login_session.get()
+        try:
+            return method(token, *args)
+        except Exception as exc:
+            if not is_session_expired(exc):
+                raise
+            record_retry()
+            return method(login_session.renew(token), *args)
 
     def call(self, resource_path, arguments):
         """
         Proxy for SOAP call API
+
+        If the API has a cache, results of calls to the cached paths are
+        returned from the cache when available.
         """
-        if self.protocol == 'xmlrpc':
-            return self.client.call(self.session, resource_path, arguments)
-        elif self.protocol == 'rest':
-            return self.client.call(resource_path, arguments)
+        if self.cache is None or resource_path not in self.cached_paths:
+            return self._call(resource_path, arguments)
+        key = cache_key(resource_path, arguments)
+        result = self.cache.get(key, MISSING)
+        if result is MISSING:
+            result = self._call(resource_path, arguments)
+            self.cache.set(key, result)
+        return result
+
+    def add_observer(self, observer):
+        """
+        Add an observer notified after every request made to magento by
+        this API and its sub APIs, eg: a
+        :class:`magento.metrics.HistogramObserver`
+
+        :param observer: A :class:`magento.metrics.Observer`
+        """
+        with self.lock:
+            self.observers.append(observer)
+
+    def _observe(self, resource_path, calls, request, *args):
+        """
+        Make a request with `request(*args)` and notify the observers
+
+        :param resource_path: Resource path to report
+        :param calls: Number of calls in the request, None for a single
+                      call
+        """
+        start_exchange()
+        start = time.time()
+        fault_code = error = None
+        faults = 0
+        try:
+            result = request(*args)
+        except Exception as exc:
+            error = exc
+            fault_code = getattr(exc, 'faultCode', None)
+            faults = fault_code is not None and (calls or 1) or 0
+            raise
         else:
-            return self.client.service.call(
-                self.session, resource_path, arguments)
+            if calls is not None:
+                faults = sum(
+                    1 for item in result if isinstance(item, Exception)
+                    or get_fault(item) is not None
+                )
+            return result
+        finally:
+            event = CallEvent(
+                resource_path, self.protocol, calls or 1,
+                exchange.request_size or None,
+                exchange.response_size or None,
+                time.time() - start, exchange.retries, fault_code, error,
+                faults,
+            )
+            for observer in self.observers:
+                observer.observe(event)
+
+    def _call(self, resource_path, arguments):
+        """
+        Make the call to magento
+        """
+        if self.protocol == 'rest' and resource_path in REST_SEARCHES:
+            return list(self.iter_call(resource_path, arguments))
+        if self.observers:
+            return self._observe(
+                resource_path, None, self._request, resource_path, arguments
+            )
+        return self._request(resource_path, arguments)
+
+    def _request(self, resource_path, arguments):
+        """
+        Send the call to magento, going through the rate limiter, circuit
+        breaker and retry policy of the API if any
+        """
+        return self._guard(
+            [resource_path], self._send, resource_path, arguments
+        )
+
+    def _guard(self, resource_paths, request, *args):
+        """
+        Run `request(*args)` through the rate limiter, the circuit
+        breaker and the retry policy of the API. Every retry waits for the
+        rate limiter again.
+
+        :param resource_paths: Resource paths called by the request
+        """
+        return self._run_guarded(
+            resource_paths, self.rate_limiter and self.rate_limiter.run,
+            request, args
+        )
 
-    def multiCall(self, calls):
+    def _guard_stream(self, resource_paths, request, *args):
+        """
+        Like :meth:`_guard`, for a request returning an iterator over a
+        response which is still being read. The request holds its slot of
+        the rate limiter until the iterator is exhausted or closed.
+        """
+        return self._run_guarded(
+            resource_paths,
+            self.rate_limiter and self.rate_limiter.run_stream,
+            request, args
+        )
+
+    def _run_guarded(self, resource_paths, limit, request, args):
+        """
+        Run `request(*args)` through `limit`, a method of the rate limiter
+        if any, the circuit breaker and the retry policy
+        """
+        if limit is not None:
+            args = (request,) + args
+            request = limit
+        if self.circuit_breaker is not None:
+            args = (request,) + args
+            request = self.circuit_breaker.run
+        if self.retry_policy is not None:
+            return self.retry_policy.run(resource_paths, request, *args)
+        return request(*args)
+
+    def _send(self, resource_path, arguments):
+        """
+        Send the call to magento
+        """
+        if self.protocol == 'rest':
+            if self.client is None:
+                self.connect()
+            path, arguments, convert = rest.translate(
+                resource_path, arguments
+            )
+            result = self.client.call(path, arguments)
+            if convert is not None:
+                result = convert(result)
+            return result
+        return self._call_with_session('call', resource_path, arguments)
+
+    def iter_call(self, resource_path, arguments):
+        """
+        Make a call returning a list, and return an iterator over its
+        elements.
+
+        With the xmlrpc protocol and the default transport, the response
+        is parsed as it is read and the elements are yielded as soon as
+        they are decoded, so memory use depends on the size of one element
+        rather than on the size of the response. Otherwise, the result of
+        :meth:`call` is iterated.
+
+        With the REST protocol, the list calls of :data:`REST_SEARCHES`
+        are translated to searchCriteria and fetched page by page with
+        :meth:`iter_search`.
+
+        The response is not cached, and observers are notified once the
+        first element is parsed.
+        """
+        if self.protocol == 'rest' and resource_path in REST_SEARCHES:
+            return self.iter_search(
+                REST_SEARCHES[resource_path], arguments and arguments[0]
+            )
+        self._get_login_session()
+        if self.protocol != 'xmlrpc' or \
+                not hasattr(self.client('transport'), 'stream'):
+            return iter(self.call(resource_path, arguments))
+        if self.observers:
+            return self._observe(
+                resource_path, None, self._guard_stream, [resource_path],
+                self._call_with_session, self._open_stream, resource_path,
+                arguments
+            )
+        return self._guard_stream(
+            [resource_path], self._call_with_session, self._open_stream,
+            resource_path, arguments
+        )
+
+    #: Default number of records fetched per request by :meth:`iter_search`
+    rest_page_size = 100
+
+    def iter_search(self, path, filters=None, fields=None, page_size=None,
+                    prefetch=False, sort_orders=None):
+        """
+        Iterate over the records of a search endpoint of the REST API, eg:
+        `products`, with the filters of the list calls of magento 1, see
+        :meth:`magento.rest.Client.iter_search`. Every page is a call of
+        its own, which goes through the rate limiter, the retry policy
+        and the observers of the API.
+
+        :param path: Path of the search endpoint
+        :param filters: `{<attribute>: {<operator>: <value>}}`
+        :param fields: Names of the fields of the records to return
+        :param page_size: Number of records fetched per request, defaults
+                          to :attr:`rest_page_size`
+        :param prefetch: Fetch the next page in the background while the
+                         current page is consumed
+        :param sort_orders: List of `(<attribute>, 'ASC' or 'DESC')` pairs
+        """
+        if self.client is None:
+            self.connect()
+        return self.client.iter_search(
+            path, filters, fields, page_size or self.rest_page_size,
+            prefetch, sort_orders, self._call,
+        )
+
+    def _open_stream(self, session, resource_path, arguments):
+        """
+        Send an xmlrpc call through the streaming transport and return an
+        iterator over its elements. The first element is parsed before
+        returning, so that a fault, like an expired session, is raised
+        here.
+        """
+        url = urlsplit(self.url)
+        handler = url.path + (url.query and '?' + url.query or '')
+        transport = self.client('transport')
+        items = transport.stream(
+            url.netloc, handler or '/RPC2', transport.codec.dumps(
+                (session, resource_path, arguments), 'call'
+            )
+        )
+        for item in items:
+            return chain([item], items)
+        return iter([])
+
+    #: Default number of calls sent in one request by :meth:`multiCall`
+    multicall_chunk_size = 200
+
+    def multiCall(self, calls, chunk_size=None, workers=1, retries=0):
         """
         Proxy for multicalls
+
+        The calls are sent in chunks of `chunk_size` calls, so that a large
+        number of calls does not end up in one huge request. The returned
+        list is aligned with `calls`: every item is either the result of
+        the call or, if magento reported a fault for that call, a `Fault`.
+        If a chunk still fails after `retries` attempts, the exception
+        raised is set in place of the result of every call of the chunk.
+
+        With the REST protocol, which has no multicall, every call is a
+        request of its own and up to `workers` of them, or as many as the
+        connection pool holds by default, are sent at once. Calls magento
+        rejects get a `Fault` with the HTTP status as code, and the calls
+        which failed otherwise are sent again up to `retries` times. The
+        calls of magento 1 are translated to REST requests, see
+        :data:`magento.rest.TRANSLATIONS`, and many calls to a resource
+        with a bulk endpoint are sent as one bulk request, see
+        :attr:`rest_bulk`.
+
+        :param calls: List of `[resource_path, arguments]` pairs
+        :param chunk_size: Number of calls per request, defaults to
+                           :attr:`multicall_chunk_size`
+        :param workers: Number of chunks sent in parallel
+        :param retries: Number of times a failed chunk is sent again
+        :return: `list` of results and faults
         """
-        if self.protocol == 'xmlrpc':
-            return self.client.multiCall(self.session, calls)
+        if self.protocol == 'rest':
+            return self._rest_multi_call(
+                calls, workers > 1 and workers or None, retries
+            )
+        chunk_size = chunk_size or self.multicall_chunk_size
+        chunks = [
+            calls[index:index + chunk_size]
+            for index in range(0, len(calls), chunk_size)
+        ]
+        if workers > 1 and len(chunks) > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(
+                    lambda chunk: self._multi_call_chunk(chunk, retries),
+                    chunks
+                ))
         else:
-            return self.client.service.multiCall(self.session, calls)
+            results = [
+                self._multi_call_chunk(chunk, retries) for chunk in chunks
+            ]
+        return [result for chunk in results for result in chunk]
+
+    def call_parallel(self, calls, workers=None):
+        """
+        Make several calls at once over a pool of threads. Unlike
+        :meth:`multiCall`, every call is a request of its own, so this works
+        for any resource and a slow call does not hold back the others.
+        The threads share the pooled connections and the login session of
+        the API.
+
+        :param calls: List of `[resource_path, arguments]` pairs
+        :param workers: Number of threads, defaults to the size of the
+                        connection pool
+        :return: `list` aligned with `calls` of results, with the exception
+                 raised in place of the result of every failed call
+        """
+        def call(resource_path_arguments):
+            try:
+                return self.call(*resource_path_arguments)
+            except Exception as exc:
+                return exc
+
+        workers = min(workers or self.pool_maxsize, len(calls))
+        if workers <= 1:
+            return [call(item) for item in calls]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(call, calls))
+
+    def bulk(self, path, payloads, method='POST'):
+        """
+        Submit requests to one endpoint of the REST API in a single bulk
+        request, which magento processes in the background, see
+        :meth:`magento.rest.Client.bulk`. Like other calls, the request
+        goes through the rate limiter, the circuit breaker, the retry
+        policy and the observers of the API, and so do the polls of the
+        returned operation.
+
+        :param path: Path of the endpoint, eg: `products`
+        :param payloads: `list` of the bodies of the requests
+        :param method: HTTP method of the endpoint
+        :return: :class:`magento.rest.BulkOperation`
+        """
+        if self.protocol != 'rest':
+            raise RuntimeError('Bulk requests need the REST protocol')
+        if self.client is None:
+            self.connect()
+        return self.client.bulk(path, payloads, method, self._call)
+
+    #: Send the calls of :meth:`multiCall` to a resource which has a bulk
+    #: endpoint in the REST API, like `cataloginventory_stock_item.update`,
+    #: as one bulk request. Magento processes bulk requests with its
+    #: message queue consumers, which must be running.
+    rest_bulk = True
+
+    #: Seconds :meth:`multiCall` waits for magento to process a bulk
+    #: request
+    rest_bulk_timeout = 600
+
+    def _rest_multi_call(self, calls, workers, retries):
+        """
+        Fan the calls of :meth:`multiCall` out as REST requests, or send
+        them as one bulk request
+        """
+        for resource_path, arguments in calls:
+            # Raises the error of the calls which cannot be sent at all
+            rest.translate(resource_path, arguments)
+        resource_paths = set(resource_path for resource_path, _ in calls)
+        if self.rest_bulk and len(calls) > 1 and len(resource_paths) == 1:
+            resource_path = list(resource_paths)[0]
+            if resource_path in rest.BULK_ENDPOINTS:
+                return self._rest_bulk_call(resource_path, calls)
+        if self.client is None:
+            self.connect()
+        results = self.client.multiCall(calls, workers, self._call)
+        for attempt in range(retries):
+            failed = [
+                index for index, result in enumerate(results)
+                if isinstance(result, Exception) and
+                not isinstance(result, Fault)
+            ]
+            if not failed:
+                break
+            retried = self.client.multiCall(
+                [calls[index] for index in failed], workers, self._call
+            )
+            for index, result in zip(failed, retried):
+                results[index] = result
+        return results
+
+    def _rest_bulk_call(self, resource_path, calls):
+        """
+        Send calls of :meth:`multiCall` to the same resource as a bulk
+        request and wait for magento to process them
+        """
+        method, path, payload = rest.BULK_ENDPOINTS[resource_path]
+        try:
+            operation = self.bulk(path, [
+                payload(*arguments) for _, arguments in calls
+            ], method)
+            results = operation.wait(self.rest_bulk_timeout)
+        except Exception as exc:
+            return [rest.get_fault(exc) or exc] * len(calls)
+        for index, result in enumerate(results):
+            if result is None:
+                # Magento did not report the operation as done, which
+                # cannot be taken for a success
+                results[index] = Fault(
+                    rest.STATUS_OPEN,
+                    'Operation of bulk %s not done' % operation.uuid
+                )
+            elif not isinstance(result, Exception):
+                results[index] = True
+        return results
+
+    def _multi_call_chunk(self, calls, retries):
+        """
+        Send one chunk of calls of :meth:`multiCall`
+        """
+        resource_paths = set(resource_path for resource_path, _ in calls)
+        resource_path = len(resource_paths) == 1 and \
+            list(resource_paths)[0] or 'multiCall'
+        for attempt in range(retries + 1):
+            try:
+                if self.observers:
+                    results = self._observe(
+                        resource_path, len(calls), self._guard,
+                        resource_paths, self._call_with_session,
+                        'multiCall', calls
+                    )
+                else:
+                    results = self._guard(
+                        resource_paths, self._call_with_session,
+                        'multiCall', calls
+                    )
+            except Exception as exc:
+                error = exc
+            else:
+                return [
+                    get_fault(result) or result for result in results
+                ]
+        return [error] * len(calls)
 
     _missing = []
 
+    #: Attributes which sub APIs share with the API they were created from
+    _shared_attributes = (
+        'client', 'login_session', 'cache', 'cached_paths', 'observers',
+        'retry_policy', 'circuit_breaker', 'rate_limiter',
+    )
+
+    def share_from(self, parent):
+        """
+        Use the connection and login session of the `parent` API instead
+        of opening new ones.
+
+        :param parent: An instance of :class:`API`
+        """
+        parent._get_login_session()
+        for attribute in self._shared_attributes:
+            setattr(self, attribute, getattr(parent, attribute))
+
     def get_instance_of(self, Klass):
         """
         Return an instance of the client API with the same auth credentials
         that the API server was instanciated with. The created instance is
         cached, so subsequent requests get an already existing instance.
 
+        The instance shares the connection and the login session of this
+        API, so no matter how many sub APIs are used, there is only one
+        login to magento.
+
         :param Klass: The klass for which the instance has to be created.
         """
         with self.lock:
@@ -235,6 +867,233 @@ class API(object):
                     self.version,
                     True,
                     self.protocol,
+                    self.transport,
+                    self.verify_ssl,
+                    self.pool_maxsize,
+                    self.pool_idle_timeout,
                 )
-                self.__dict__[Klass.__name__] = value.__enter__()
+                value.share_from(self)
+                self.__dict__[Klass.__name__] = value
             return value
+
+    def batch(self, size=100):
+        """
+        Return a :class:`Batch` which queues calls and sends them to
+        magento as multicalls of `size` calls. Use it as a context manager
+        to send the remaining calls when the block ends::
+
+            with client.batch(size=200) as batch:
+                results = [
+                    batch.product.update(sku, data)
+                    for sku, data in updates
+                ]
+            for result in results:
+                print(result.result())
+
+        :param size: Number of calls sent in one multicall
+        """
+        return Batch(self, size)
+
+
+def get_api_class(name):
+    """
+    Return the subclass of :class:`API` which is available as the
+    property `name` of the API, eg: `product` for `Product`
+
+    :param name: snake case name of the API
+    """
+    classes = [API]
+    while classes:
+        Klass = classes.pop()
+        if not Klass.__dict__.get('__abstract__', False) and \
+                camel_2_snake(Klass.__name__) == name:
+            return Klass
+        classes.extend(Klass.__subclasses__())
+    return None
+
+
+class Deferred(BaseException):
+    """
+    Raised to stop a method of a sub API at the point where it calls
+    magento, once the call was queued in a :class:`Batch`
+    """
+
+
+class Batch(object):
+    """
+    Queue of calls sent to magento as multicalls.
+
+    Every queued call returns a `concurrent.futures.Future` which gets the
+    result once the multicall it is part of was sent. A fault reported by
+    magento for one of the calls is set as the exception of its future
+    only. The queue is sent as soon as it holds `size` calls, and when
+    :meth:`flush` is called or the `with` block ends.
+
+    The sub APIs of the API are available on the batch with the same
+    names. Their methods queue the call they make and return a future for
+    what the method would have returned.
+    """
+
+    def __init__(self, api, size=100):
+        """
+        :param api: The :class:`API` sending the multicalls
+        :param size: Number of calls sent in one multicall
+        """
+        self.api = api
+        self.size = size
+        self.queue = []
+        self.lock = Lock()
+
+    def call(self, resource_path, arguments, callback=None):
+        """
+        Queue a call and return a future for its result
+
+        :param resource_path: Resource path as given to :meth:`API.call`
+        :param arguments: Arguments of the call
+        :param callback: Optional function applied to the result of the
+                         call before it is set on the future
+        """
+        future = Future()
+        with self.lock:
+            self.queue.append((resource_path, arguments, callback, future))
+            if len(self.queue) < self.size:
+                return future
+            queue, self.queue = self.queue, []
+        self.send(queue)
+        return future
+
+    def flush(self):
+        """
+        Send all the queued calls
+        """
+        with self.lock:
+            queue, self.queue = self.queue, []
+        if queue:
+            self.send(queue)
+
+    def send(self, queue):
+        """
+        Send the given calls as one multicall and set their futures. If
+        the multicall fails as a whole, its error is set on all of them
+        and raised.
+        """
+        try:
+            results = self.api.multiCall([
+                [resource_path, arguments]
+                for resource_path, arguments, callback, future in queue
+            ], chunk_size=len(queue))
+        except Exception as exc:
+            for _, _, _, future in queue:
+                future.set_exception(exc)
+            raise
+        for (_, _, callback, future), result in zip(queue, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+                continue
+            try:
+                if callback is not None:
+                    result = callback(result)
+            except Exception as exc:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.flush()
+
+    def __getattr__(self, name):
+        Klass = get_api_class(name)
+        if Klass is None:
+            raise AttributeError(name)
+        value = BatchResource(self, Klass)
+        setattr(self, name, value)
+        return value
+
+
+class BatchResource(object):
+    """
+    Makes the methods of a sub API queue their call in a :class:`Batch`
+    and return a future instead of calling magento.
+
+    The method is run twice: first until it calls magento, which gives
+    the call to queue, and then once the result is known, to get the value
+    the method returns for that result. Only methods making a single call
+    to magento can be batched: the others, like `info_multi` or
+    `iter_list`, raise a `ValueError`.
+    """
+
+    #: Methods of the sub APIs making several calls, or a streamed one,
+    #: which cannot be queued as one call
+    unbatchable = (
+        'multiCall', 'call_parallel', 'iter_call', 'iter_search', 'bulk',
+    )
+
+    def __init__(self, batch, Klass):
+        """
+        :param batch: The :class:`Batch` in which calls are queued
+        :param Klass: The class of the sub API, eg: `magento.Product`
+        """
+        self.batch = batch
+        self.Klass = Klass
+
+    def error(self, name):
+        return ValueError(
+            '%s.%s cannot be batched: it makes several calls to magento '
+            'or streams the response of one' % (self.Klass.__name__, name)
+        )
+
+    def bind(self, name, call):
+        """
+        Return a copy of the sub API of the batch's API making its calls
+        with `call`
+
+        :param name: Name of the method run on the copy, for the errors
+        :param call: Replaces :meth:`API.call`
+        """
+        api = self.batch.api.get_instance_of(self.Klass)
+        resource = self.Klass.__new__(self.Klass)
+        resource.__dict__.update(api.__dict__)
+        resource.call = call
+
+        def unbatchable(*args, **kwargs):
+            raise self.error(name)
+        for attribute in self.unbatchable:
+            setattr(resource, attribute, unbatchable)
+        return resource
+
+    def __getattr__(self, name):
+        method = getattr(self.Klass, name)
+        if not callable(method):
+            return method
+
+        def wrapper(*args, **kwargs):
+            queued = []
+
+            def queue(resource_path, arguments):
+                queued.append((resource_path, arguments))
+                raise Deferred()
+
+            future = Future()
+            try:
+                future.set_result(
+                    method(self.bind(name, queue), *args, **kwargs)
+                )
+                return future
+            except Deferred:
+                pass
+            resource_path, arguments = queued[0]
+
+            def replay(result):
+                replayed = []
+
+                def call(resource_path, arguments):
+                    if replayed:
+                        raise self.error(name)
+                    replayed.append(resource_path)
+                    return result
+                return method(self.bind(name, call), *args, **kwargs)
+            return self.batch.call(resource_path, arguments, replay)
+        return wrapper
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+'''
+    magento.cache
+
+    Caches for the results of calls returning reference data
+
+    :license: BSD, see LICENSE for more details
+'''
+import json
+import os
+import pickle
+import sqlite3
+import time
+from collections import OrderedDict
+from threading import Lock
+
+#: Resource paths returning data which rarely changes. These are the
+#: paths cached by default when a cache is given to
+#: :class:`magento.api.API`
+REFERENCE_DATA_PATHS = frozenset([
+    'directory_country.list',
+    'directory_region.list',
+    'store.list',
+    'store.info',
+    'customer_group.list',
+    'catalog_product_type.list',
+    'catalog_product_attribute_set.list',
+    'catalog_product_attribute.options',
+    'catalog_product_link.types',
+])
+
+#: Returned by the `get` method of the caches when the key is not cached
+MISSING = object()
+
+
+def cache_key(resource_path, arguments):
+    """
+    Return the key under which the result of a call is cached
+
+    :param resource_path: Resource path of the call
+    :param arguments: Arguments of the call
+    """
+    return '%s:%s' % (
+        resource_path, json.dumps(arguments, sort_keys=True, default=str)
+    )
+
+
+class MemoryCache(object):
+    """
+    In memory cache with a time to live and least recently used eviction.
+
+    The cached values are returned as they are, so they must not be
+    modified by the caller.
+    """
+
+    def __init__(self, maxsize=1024, ttl=3600):
+        """
+        :param maxsize: Maximum number of cached values
+        :param ttl: Seconds for which a value is cached
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key, default=MISSING):
+        """
+        Return the value cached for the key, or `default`
+        """
+        with self._lock:
+            item = self._data.pop(key, None)
+            if item is None or item[1] < time.time():
+                return default
+            self._data[key] = item
+            return item[0]
+
+    def set(self, key, value):
+        """
+        Cache the value for the key
+        """
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (value, time.time() + self.ttl)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        """
+        Remove all the cached values
+        """
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteCache(object):
+    """
+    Cache stored in a sqlite database, with a time to live and least
+    recently used eviction. The database file can be shared by several
+    worker processes.
+
+    Values are stored pickled, so only use a database file which no one
+    else can write to.
+    """
+
+    def __init__(self, path, maxsize=10000, ttl=3600):
+        """
+        :param path: Path of the database file
+        :param maxsize: Maximum number of cached values
+        :param ttl: Seconds for which a value is cached
+        """
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._connection = None
+        self._pid = None
+        self._lock = Lock()
+
+    @property
+    def connection(self):
+        """
+        The connection to the database. A new connection is opened in
+        forked processes.
+        """
+        if self._connection is None or self._pid != os.getpid():
+            self._connection = sqlite3.connect(
+                self.path, timeout=30, isolation_level=None,
+                check_same_thread=False,
+            )
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value BLOB, '
+                'expires REAL, used REAL)'
+            )
+            self._pid = os.getpid()
+        return self._connection
+
+    def get(self, key, default=MISSING):
+        """
+        Return the value cached for the key, or `default`
+        """
+        now = time.time()
+        with self._lock:
+            row = self.connection.execute(
+                'SELECT value FROM cache WHERE key = ? AND expires >= ?',
+                (key, now)
+            ).fetchone()
+            if row is None:
+                return default
+            self.connection.execute(
+                'UPDATE cache SET used = ? WHERE key = ?', (now, key)
+            )
+        return pickle.loads(bytes(row[0]))
+
+    def set(self, key, value):
+        """
+        Cache the value for the key
+        """
+        now = time.time()
+        value = sqlite3.Binary(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        with self._lock:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO cache (key, value, expires, used) '
+                'VALUES (?, ?, ?, ?)', (key, value, now + self.ttl, now)
+            )
+            self.connection.execute(
+                'DELETE FROM cache WHERE expires < ? OR key IN ('
+                'SELECT key FROM cache ORDER BY used DESC LIMIT -1 OFFSET ?'
+                ')', (now, self.maxsize)
+            )
+
+    def clear(self):
+        """
+        Remove all the cached values
+        """
+        with self._lock:
+            self.connection.execute('DELETE FROM cache')
@@ -10,6 +10,8 @@
 import warnings
 
 from magento.api import API
+from magento.columns import Columns
+from magento.records import ProductRecord, StockRecord
 
 
 class Category(API):
@@ -18,6 +20,10 @@ class Category(API):
     """
     __slots__ = ()
 
+    #: :class:`magento.categories.CategoryIndex` instances updated by the
+    #: changes made with this API
+    category_indexes = ()
+
     def currentStore(self, store_view=None):
         """
         Set/Get current store view
@@ -64,6 +70,24 @@ class Category(API):
             'catalog_category.info', [category_id, store_view, attributes]
         )
 
+    def info_multi(self, category_ids, store_view=None, attributes=None):
+        """
+        Retrieve details of several categories in parallel
+
+        :param category_ids: List of IDs of categories to retrieve
+        :param store_view: Store view ID or code
+        :param attributes: Return the fields specified
+        :return: `list` of `dict`, with the exception raised in place of
+                 every category which could not be retrieved
+        """
+        return self.call_parallel([
+            [
+                'catalog_category.info',
+                [category_id, store_view, attributes]
+            ]
+            for category_id in category_ids
+        ])
+
     def create(self, parent_id, data, store_view=None):
         """
         Create new category and return its ID
@@ -73,9 +97,12 @@ class Category(API):
         :param store_view: Store view ID or Code
         :return: Integer ID
         """
-        return int(self.call(
+        category_id = int(self.call(
             'catalog_category.create', [parent_id, data, store_view])
         )
+        for index in self.category_indexes:
+            index.notify('created', category_id)
+        return category_id
 
     def update(self, category_id, data, store_view=None):
         """
@@ -86,11 +113,38 @@ class Category(API):
         :param store_view: Store view ID or code
         :return: Boolean
         """
-        return bool(
+        result = bool(
             self.call(
                 'catalog_category.update', [category_id, data, store_view]
             )
         )
+        for index in self.category_indexes:
+            index.notify('updated', int(category_id))
+        return result
+
+    def update_multi(self, category_data_pairs, store_view=None):
+        """
+        Update several categories in parallel
+
+        :param category_data_pairs: List of pairs of category ID and data
+        :param store_view: Store view ID or code
+        :return: `list` of results, with the exception raised in place of
+                 every category which could not be updated
+        """
+        category_data_pairs = list(category_data_pairs)
+        results = self.call_parallel([
+            [
+                'catalog_category.update',
+                [category_id, data, store_view]
+            ]
+            for category_id, data in category_data_pairs
+        ])
+        for index in self.category_indexes:
+            for (category_id, data), result in zip(
+                    category_data_pairs, results):
+                if not isinstance(result, Exception):
+                    index.notify('updated', int(category_id))
+        return results
 
     def move(self, category_id, parent_id, after_id=None):
         """
@@ -101,9 +155,12 @@ class Category(API):
         :param after_id: Category ID after what position it will be moved
         :return: Boolean
         """
-        return bool(self.call(
+        result = bool(self.call(
             'catalog_category.move', [category_id, parent_id, after_id])
         )
+        for index in self.category_indexes:
+            index.notify('moved', int(category_id), parent_id, after_id)
+        return result
 
     def delete(self, category_id):
         """
@@ -112,7 +169,10 @@ class Category(API):
         :param category_id: ID of category
         :return: Boolean
         """
-        return bool(self.call('catalog_category.delete', [category_id]))
+        result = bool(self.call('catalog_category.delete', [category_id]))
+        for index in self.category_indexes:
+            index.notify('deleted', int(category_id))
+        return result
 
     def assignedproducts(self, category_id, store):
         """
@@ -234,7 +294,8 @@ class Product(API):
         args = [store_view] if store_view else []
         return int(self.call('catalog_product.currentStore', args))
 
-    def list(self, filters=None, store_view=None):
+    def list(self, filters=None, store_view=None, as_records=False,
+             as_columns=False):
         """
         Retrieve product list by filters
 
@@ -246,12 +307,42 @@ class Product(API):
                    `{'firstname':{'ilike':'sharoon'}}`
 
         :param store_view: Code or ID of store view
+        :param as_records: Return :class:`magento.records.ProductRecord`
+                           instances instead of `dict`
+        :param as_columns: Return :class:`magento.columns.Columns`, built
+                           while the response is decoded
         :return: `list` of `dict`
         """
-        return self.call('catalog_product.list', [filters, store_view])
+        if as_columns:
+            return Columns.build(
+                self.iter_list(filters, store_view), ProductRecord
+            )
+        products = self.call('catalog_product.list', [filters, store_view])
+        if as_records:
+            return ProductRecord.convert(products)
+        return products
+
+    def iter_list(self, filters=None, store_view=None, as_records=False):
+        """
+        Iterate over the products matching the filters. Unlike :meth:`list`,
+        records are decoded one at a time while the response is read.
+
+        :param filters: Dictionary of filters, as for :meth:`list`
+        :param store_view: Code or ID of store view
+        :param as_records: Yield :class:`magento.records.ProductRecord`
+                           instances instead of `dict`
+
+        :return: iterator of `dict`
+        """
+        products = self.iter_call(
+            'catalog_product.list', [filters, store_view]
+        )
+        if as_records:
+            return ProductRecord.convert_iter(products)
+        return products
 
     def info(self, product, store_view=None, attributes=None,
-             identifierType=None):
+             identifierType=None, as_records=False):
         """
         Retrieve product data
 
@@ -260,14 +351,46 @@ class Product(API):
         :param attributes: List of fields required
         :param identifierType: Defines whether the product or SKU value is
                                passed in the "product" parameter.
+        :param as_records: Return a :class:`magento.records.ProductRecord`
+                           instead of a `dict`
 
         :return: `dict` of values
         """
-        return self.call(
+        result = self.call(
             'catalog_product.info', [
                 product, store_view, attributes, identifierType
             ]
         )
+        if as_records:
+            return ProductRecord.convert(result)
+        return result
+
+    def info_multi(self, products, store_view=None, attributes=None,
+                   identifierType=None, as_records=False):
+        """
+        Retrieve data of several products in parallel
+
+        :param products: List of IDs or SKUs of products
+        :param store_view: ID or Code of store view
+        :param attributes: List of fields required
+        :param identifierType: Defines whether the product or SKU value is
+                               passed in the "products" parameter.
+        :param as_records: Return :class:`magento.records.ProductRecord`
+                           instances instead of `dict`
+
+        :return: `list` of `dict`, with the exception raised in place of
+                 every product which could not be retrieved
+        """
+        results = self.call_parallel([
+            [
+                'catalog_product.info',
+                [product, store_view, attributes, identifierType]
+            ]
+            for product in products
+        ])
+        if as_records:
+            return ProductRecord.convert(results)
+        return results
 
     def create(self, product_type, attribute_set_id, sku, data):
         """
@@ -302,6 +425,28 @@ class Product(API):
             [product, data, store_view, identifierType]
         ))
 
+    def update_multi(self, product_data_pairs, store_view=None,
+                     identifierType=None):
+        """
+        Update several products in parallel
+
+        :param product_data_pairs: List of pairs of product ID or SKU and
+                                   dictionary of attributes to update
+        :param store_view: ID or Code of store view
+        :param identifierType: Defines whether the product or SKU value is
+                               passed in the "product_data_pairs".
+
+        :return: `list` of results, with the exception raised in place of
+                 every product which could not be updated
+        """
+        return self.call_parallel([
+            [
+                'catalog_product.update',
+                [product, data, store_view, identifierType]
+            ]
+            for product, data in product_data_pairs
+        ])
+
     def setSpecialPrice(self, product, special_price=None,
                         from_date=None, to_date=None, store_view=None,
                         identifierType=None):
@@ -550,6 +695,26 @@ class ProductImages(API):
         return self.call('catalog_product_attribute_media.list',
                 [product, store_view, identifierType])
 
+    def list_multi(self, products, store_view=None, identifierType=None):
+        """
+        Retrieve image lists of several products in parallel
+
+        :param products: List of IDs or SKUs of products
+        :param store_view: Code or ID of store view
+        :param identifierType: Defines whether the product or SKU value is
+                               passed in the "products" parameter.
+
+        :return: `list` of `list` of `dict`, with the exception raised in
+                 place of every product whose images could not be listed
+        """
+        return self.call_parallel([
+            [
+                'catalog_product_attribute_media.list',
+                [product, store_view, identifierType]
+            ]
+            for product in products
+        ])
+
     def info(self, product, image_file, store_view=None, identifierType=None):
         """
         Retrieve product image data
@@ -649,6 +814,26 @@ class ProductTierPrice(API):
         return self.call('catalog_product_attribute_tier_price.info',
                          [product, identifierType])
 
+    def info_multi(self, products, identifierType=None):
+        """
+        Retrieve tier prices of several products in parallel
+
+        :param products: List of IDs or SKUs of products
+        :param identifierType: Defines whether the product or SKU value is
+                               passed in the "products" parameter.
+
+        :return: `list` of `list` of `dict`, with the exception raised in
+                 place of every product whose tier prices could not be
+                 retrieved
+        """
+        return self.call_parallel([
+            [
+                'catalog_product_attribute_tier_price.info',
+                [product, identifierType]
+            ]
+            for product in products
+        ])
+
     def update(self, product, data, identifierType=None):
         """
         Update product tier prices.
@@ -845,20 +1030,31 @@ class Inventory(API):
     """
     __slots__ = ()
 
-    def list(self, products):
+    def list(self, products, as_records=False, as_columns=False):
         """
         Retrieve inventory stock data by product ids
 
         :param products: list of IDs or SKUs of products
+        :param as_records: Return :class:`magento.records.StockRecord`
+                           instances instead of `dict`
+        :param as_columns: Return :class:`magento.columns.Columns`
         :return: `list` of `dict`
         """
-        return self.call('cataloginventory_stock_item.list', [products])
+        if as_columns:
+            return Columns.build(self.iter_call(
+                'cataloginventory_stock_item.list', [products]
+            ), StockRecord)
+        items = self.call('cataloginventory_stock_item.list', [products])
+        if as_records:
+            return StockRecord.convert(items)
+        return items
 
     def update(self, product, data):
         """
         Update inventory stock data
 
-        :param product: ID or SKU of product
+        :param product: ID or SKU of product. With the REST protocol,
+                        only SKUs are accepted.
         :param data: Dictionary of data to change,
             eg dict(qty=99, is_in_stock='1')
 
@@ -875,7 +1071,11 @@ class Inventory(API):
         """
         It is usually expensive to update inventory on magento and this
         uses the multi call api to make it faster. The expected argument is
-        a list of pairs of product and data dictionaries.
+        a list of pairs of product and data dictionaries. With the REST
+        protocol, products must be given by SKU.
+
+        :return: `list` of results, with a `Fault` in place of the result
+                 of every update magento failed
         """
         return self.multiCall([
             [
@@ -0,0 +1,364 @@
+# -*- coding: utf-8 -*-
+'''
+    magento.categories
+
+    In memory index of the category tree
+
+    :license: BSD, see LICENSE for more details
+'''
+from collections import deque
+from threading import RLock
+
+#: Fields of `catalog_category.info` copied to the nodes of the index.
+#: Others, like `children`, which is a comma separated string there, are
+#: left out.
+INFO_FIELDS = ('name', 'url_key', 'position', 'level', 'is_active')
+
+
+class CategoryIndex(object):
+    """
+    The category tree of magento, downloaded once and indexed by ID,
+    path of names and URL key::
+
+        categories = api.get_instance_of(Category)
+        index = CategoryIndex(categories, root_id=2)
+        index.id_by_path('Men/Shoes/Running')
+
+    Paths are made of the names of the categories below the root of the
+    index, joined by `separator`. The root itself has the path ''.
+
+    Changes made with :meth:`magento.catalog.Category.create`, `update`,
+    `move` and `delete` of the given API are applied to the index as they
+    happen, fetching only the categories they affect with
+    :meth:`magento.catalog.Category.info`. If that fails, the index is
+    marked :attr:`stale` and downloaded again on the next lookup. Use
+    :meth:`refresh` to pick up changes made elsewhere.
+    """
+
+    #: True when a change could not be applied, so the index no longer
+    #: matches magento
+    stale = False
+
+    def __init__(self, category, root_id=None, store_view=None,
+                 url_keys=False, separator='/'):
+        """
+        :param category: The :class:`magento.catalog.Category` API
+        :param root_id: ID of the category at the root of the index, the
+                        root of the catalog by default
+        :param store_view: Store view ID or code of the names
+        :param url_keys: Also index the URL keys, which costs a call to
+                         `catalog_category.info` per category
+        :param separator: Separator of the names in paths
+        """
+        self.category = category
+        self.root_id = root_id
+        self.store_view = store_view
+        self.url_keys = url_keys
+        self.separator = separator
+        self.lock = RLock()
+        self.refresh()
+        category.category_indexes += (self,)
+
+    def refresh(self):
+        """
+        Download and index the whole tree again
+        """
+        with self.lock:
+            self.nodes = {}
+            self.paths = {}
+            self._by_path = {}
+            self.url_paths = {}
+            self._by_url_path = {}
+            self._by_url_key = {}
+            self._url_key_of = {}
+            tree = self.category.tree(self.root_id, self.store_view)
+            self.root = int(tree['category_id'])
+            self.load(tree)
+            self.index(self.root)
+            self.stale = False
+
+    def check(self):
+        """
+        Download the tree again if the index is stale
+        """
+        if self.stale:
+            self.refresh()
+
+    def load(self, tree):
+        """
+        Add the nodes of a tree returned by `catalog_category.tree`
+        """
+        loaded = []
+        stack = [tree]
+        while stack:
+            node = stack.pop()
+            children = node.get('children') or []
+            record = dict(
+                (key, value) for key, value in node.items()
+                if key != 'children'
+            )
+            record['category_id'] = int(node['category_id'])
+            record['parent_id'] = int(node.get('parent_id') or 0)
+            record['children'] = [
+                int(child['category_id']) for child in children
+            ]
+            self.nodes[record['category_id']] = record
+            loaded.append(record['category_id'])
+            stack.extend(children)
+        if self.url_keys:
+            infos = self.category.info_multi(
+                loaded, self.store_view, ['url_key']
+            )
+            for category_id, info in zip(loaded, infos):
+                if isinstance(info, dict):
+                    self.nodes[category_id]['url_key'] = info.get('url_key')
+
+    def index(self, category_id):
+        """
+        Index the paths of a category and of its descendants again
+        """
+        for node_id in self.descendants(category_id, include_self=True):
+            self.unindex(node_id)
+            node = self.nodes[node_id]
+            if node_id == self.root:
+                path = url_path = ''
+            else:
+                parent_path = self.paths[node['parent_id']]
+                parent_url_path = self.url_paths[node['parent_id']]
+                path = (parent_path and parent_path + self.separator or '') \
+                    + (node.get('name') or '')
+                url_path = (
+                    parent_url_path and parent_url_path + '/' or ''
+                ) + (node.get('url_key') or '')
+            self.paths[node_id] = path
+            self._by_path[path] = node_id
+            self.url_paths[node_id] = url_path
+            if node.get('url_key'):
+                self._by_url_path[url_path] = node_id
+                self._by_url_key.setdefault(
+                    node['url_key'], set()
+                ).add(node_id)
+                self._url_key_of[node_id] = node['url_key']
+
+    def unindex(self, category_id):
+        """
+        Remove a category from the path and URL key indexes
+        """
+        path = self.paths.pop(category_id, None)
+        if self._by_path.get(path) == category_id:
+            del self._by_path[path]
+        url_path = self.url_paths.pop(category_id, None)
+        if self._by_url_path.get(url_path) == category_id:
+            del self._by_url_path[url_path]
+        url_key = self._url_key_of.pop(category_id, None)
+        if url_key is not None:
+            self._by_url_key[url_key].discard(category_id)
+
+    # Lookups
+
+    def __contains__(self, category_id):
+        return category_id in self.nodes
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def get(self, category_id):
+        """
+        Return the data of a category, with the IDs of its children in
+        `children`, or None if it is not in the index
+        """
+        self.check()
+        return self.nodes.get(category_id)
+
+    def path(self, category_id):
+        """
+        Return the path of names of a category
+        """
+        self.check()
+        return self.paths[category_id]
+
+    def id_by_path(self, path):
+        """
+        Return the ID of the category at a path of names, eg:
+        `Men/Shoes/Running`, or None
+        """
+        self.check()
+        return self._by_path.get(path)
+
+    def id_by_url_path(self, url_path):
+        """
+        Return the ID of the category at a path of URL keys, eg:
+        `men/shoes/running`, or None. Needs an index built with
+        `url_keys`.
+        """
+        self.check()
+        return self._by_url_path.get(url_path)
+
+    def ids_by_url_key(self, url_key):
+        """
+        Return the IDs of the categories with a URL key, which is only
+        unique among siblings. Needs an index built with `url_keys`.
+        """
+        self.check()
+        return sorted(self._by_url_key.get(url_key, ()))
+
+    def parent(self, category_id):
+        """
+        Return the ID of the parent of a category, None for the root
+        """
+        self.check()
+        if category_id == self.root:
+            return None
+        return self.nodes[category_id]['parent_id']
+
+    def children(self, category_id):
+        """
+        Return the IDs of the children of a category
+        """
+        self.check()
+        return list(self.nodes[category_id]['children'])
+
+    def ancestors(self, category_id):
+        """
+        Return the IDs of the ancestors of a category within the index,
+        from its parent up to the root
+        """
+        self.check()
+        ancestors = []
+        while category_id != self.root:
+            category_id = self.nodes[category_id]['parent_id']
+            ancestors.append(category_id)
+        return ancestors
+
+    def descendants(self, category_id, include_self=False):
+        """
+        Return the IDs of the descendants of a category, parents before
+        their children
+        """
+        descendants = include_self and [category_id] or []
+        queue = deque(self.nodes[category_id]['children'])
+        while queue:
+            node_id = queue.popleft()
+            descendants.append(node_id)
+            queue.extend(self.nodes[node_id]['children'])
+        return descendants
+
+    # Incremental refresh, called by the Category API
+
+    def fetch(self, category_id):
+        """
+        Return the data of a category from `catalog_category.info`
+        """
+        info = self.category.info(category_id, self.store_view)
+        node = self.nodes.get(category_id) or {'children': []}
+        node.update(
+            (key, value) for key, value in info.items()
+            if key in INFO_FIELDS
+        )
+        node['category_id'] = category_id
+        node['parent_id'] = int(info['parent_id'])
+        return node
+
+    def attach(self, category_id, parent_id, after_id=None):
+        """
+        Add a category to the children of its parent, after `after_id`
+        or else at the end
+        """
+        children = self.nodes[parent_id]['children']
+        if after_id is not None and int(after_id) in children:
+            children.insert(children.index(int(after_id)) + 1, category_id)
+        else:
+            children.append(category_id)
+
+    def detach(self, category_id):
+        """
+        Remove a category from the children of its parent
+        """
+        parent = self.nodes.get(self.nodes[category_id]['parent_id'])
+        if parent is not None and category_id in parent['children']:
+            parent['children'].remove(category_id)
+
+    def remove(self, category_id):
+        """
+        Remove a category and its descendants from the index
+        """
+        self.detach(category_id)
+        for node_id in self.descendants(category_id, include_self=True):
+            self.unindex(node_id)
+            del self.nodes[node_id]
+
+    def notify(self, change, *args):
+        """
+        Apply a change made with the API, eg: `notify('created', 12)`. The
+        change was already made in magento, so if applying it fails, the
+        index is marked stale instead of raising the error.
+        """
+        if self.stale:
+            return
+        try:
+            getattr(self, change)(*args)
+        except Exception:
+            self.stale = True
+
+    def created(self, category_id):
+        """
+        Add a category created with the API
+        """
+        with self.lock:
+            node = self.fetch(category_id)
+            if node['parent_id'] not in self.nodes:
+                return
+            self.nodes[category_id] = node
+            self.attach(category_id, node['parent_id'])
+            self.index(category_id)
+
+    def updated(self, category_id):
+        """
+        Fetch again a category updated with the API
+        """
+        with self.lock:
+            if category_id in self.nodes:
+                self.fetch(category_id)
+                self.index(category_id)
+
+    def moved(self, category_id, parent_id, after_id=None):
+        """
+        Move a category moved with the API, with its descendants
+        """
+        with self.lock:
+            parent_id = int(parent_id)
+            if category_id == self.root:
+                return
+            if category_id not in self.nodes:
+                if parent_id in self.nodes:
+                    # Moved into the indexed tree
+                    self.load(self.category.tree(
+                        category_id, self.store_view
+                    ))
+                    self.nodes[category_id]['parent_id'] = parent_id
+                    self.attach(category_id, parent_id, after_id)
+                    self.index(category_id)
+                return
+            if parent_id not in self.nodes:
+                # Moved out of the indexed tree
+                self.remove(category_id)
+                return
+            self.detach(category_id)
+            node = self.fetch(category_id)
+            self.attach(category_id, parent_id, after_id)
+            level = node.get('level')
+            if level is not None:
+                for node_id in self.descendants(category_id):
+                    parent = self.nodes[self.nodes[node_id]['parent_id']]
+                    self.nodes[node_id]['level'] = str(
+                        int(parent['level']) + 1
+                    )
+            self.index(category_id)
+
+    def deleted(self, category_id):
+        """
+        Remove a category deleted with the API, with its descendants
+        """
+        with self.lock:
+            if category_id in self.nodes and category_id != self.root:
+                self.remove(category_id)
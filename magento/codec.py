@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+'''
+    magento.codec
+
+    Encoding and decoding of xmlrpc messages. :class:`FastCodec` is a
+    faster replacement of the marshalling of `xmlrpclib`, which parses
+    responses with lxml when it is installed, or with the C parser of
+    `xml.etree` otherwise.
+
+    :license: BSD, see LICENSE for more details
+'''
+import sys
+from datetime import datetime
+
+if sys.version_info < (3, 0):
+    from xmlrpclib import ServerProxy as BaseServerProxy
+    from xmlrpclib import Binary, DateTime, Fault, dumps, loads
+    from xmlrpclib import MAXINT, MININT
+else:
+    from xmlrpc.client import ServerProxy as BaseServerProxy
+    from xmlrpc.client import Binary, DateTime, Fault, dumps, loads
+    from xmlrpc.client import MAXINT, MININT
+
+try:
+    from lxml import etree
+except ImportError:
+    try:
+        import xml.etree.cElementTree as etree
+    except ImportError:
+        import xml.etree.ElementTree as etree
+    BACKEND = 'etree'
+    parse = etree.fromstring
+else:
+    BACKEND = 'lxml'
+
+    def parse(data):
+        # Parsers of lxml must not be shared by threads
+        return etree.fromstring(data, etree.XMLParser(
+            resolve_entities=False, huge_tree=True
+        ))
+
+
+class Codec(object):
+    """
+    Encodes and decodes xmlrpc messages with the marshalling of
+    `xmlrpclib`
+    """
+    name = 'stdlib'
+
+    def __init__(self, use_datetime=False):
+        """
+        :param use_datetime: Decode dates as `datetime.datetime` instead
+                             of `xmlrpclib.DateTime`
+        """
+        self.use_datetime = use_datetime
+
+    def dumps(self, params, methodname):
+        """
+        Return the body of the request calling `methodname` with `params`
+        """
+        return to_bytes(dumps(params, methodname, allow_none=True))
+
+    def loads(self, data):
+        """
+        Return the tuple of values of the response `data`, or raise the
+        `Fault` it holds
+        """
+        return loads(data, self.use_datetime)[0]
+
+
+def to_bytes(body):
+    """
+    Encode a request body like `xmlrpclib.ServerProxy` does
+    """
+    if not isinstance(body, bytes):
+        body = body.encode('utf-8', 'xmlcharrefreplace')
+    return body
+
+
+class Unsupported(Exception):
+    """
+    Raised by :class:`FastCodec` for values it leaves to `xmlrpclib`
+    """
+
+
+def escape(text):
+    if '&' in text:
+        text = text.replace('&', '&amp;')
+    if '<' in text:
+        text = text.replace('<', '&lt;')
+    if '>' in text:
+        text = text.replace('>', '&gt;')
+    return text
+
+
+def encode_value(value, write):
+    """
+    Write the xmlrpc encoding of `value`, the same as the one of
+    `xmlrpclib.Marshaller`
+    """
+    kind = type(value)
+    if kind is str:
+        write('<value><string>%s</string></value>\n' % escape(value))
+    elif kind is dict:
+        write('<value><struct>\n')
+        for key, item in value.items():
+            if type(key) is not str:
+                raise Unsupported()
+            if type(item) is str:
+                # Inlined for strings, the bulk of the values sent
+                write(
+                    '<member>\n<name>%s</name>\n<value><string>%s'
+                    '</string></value>\n</member>\n' % (
+                        escape(key), escape(item)
+                    )
+                )
+                continue
+            write('<member>\n<name>%s</name>\n' % escape(key))
+            encode_value(item, write)
+            write('</member>\n')
+        write('</struct></value>\n')
+    elif kind is list or kind is tuple:
+        write('<value><array><data>\n')
+        for item in value:
+            encode_value(item, write)
+        write('</data></array></value>\n')
+    elif kind is int:
+        if value > MAXINT or value < MININT:
+            raise Unsupported()
+        write('<value><int>%d</int></value>\n' % value)
+    elif value is None:
+        write('<value><nil/></value>')
+    elif kind is bool:
+        write(value and '<value><boolean>1</boolean></value>\n' or
+              '<value><boolean>0</boolean></value>\n')
+    elif kind is float:
+        write('<value><double>%r</double></value>\n' % value)
+    else:
+        raise Unsupported()
+
+
+def decode_value(element, use_datetime=False):
+    """
+    Return the python value of a `<value>` element
+    """
+    if not len(element):
+        return element.text or ''
+    element = element[0]
+    tag = element.tag
+    if tag == 'string':
+        return element.text or ''
+    if tag == 'struct':
+        return dict(
+            (member[0].text or '', decode_value(member[1], use_datetime))
+            for member in element
+        )
+    if tag == 'array':
+        return [
+            decode_value(item, use_datetime) for item in element[0]
+        ]
+    if tag in ('int', 'i4', 'i8'):
+        return int(element.text)
+    if tag == 'nil':
+        return None
+    if tag == 'boolean':
+        if element.text == '1':
+            return True
+        if element.text == '0':
+            return False
+    elif tag == 'double':
+        return float(element.text)
+    elif tag == 'dateTime.iso8601':
+        if use_datetime:
+            return datetime.strptime(element.text, '%Y%m%dT%H:%M:%S')
+        return DateTime(str(element.text).strip())
+    elif tag == 'base64':
+        value = Binary()
+        value.decode((element.text or '').encode('ascii'))
+        return value
+    raise Unsupported()
+
+
+class FastCodec(Codec):
+    """
+    Codec giving the same requests as `xmlrpclib`, byte for byte, and
+    the same values for responses, but faster.
+
+    Requests are written without the dispatching of the marshaller of
+    `xmlrpclib`. Responses are parsed into a tree by lxml or `xml.etree`,
+    both written in C, and the tree is converted to python values, which
+    avoids a python callback for every element. Values the codec does not
+    handle itself are left to `xmlrpclib`.
+    """
+    name = BACKEND
+
+    def dumps(self, params, methodname):
+        out = [
+            "<?xml version='1.0'?>\n<methodCall>\n<methodName>%s"
+            "</methodName>\n<params>\n" % methodname
+        ]
+        write = out.append
+        try:
+            for param in params:
+                write('<param>\n')
+                encode_value(param, write)
+                write('</param>\n')
+        except (Unsupported, RuntimeError):
+            # Raises the error of xmlrpclib, eg: for a recursive value
+            return Codec.dumps(self, params, methodname)
+        write('</params>\n</methodCall>\n')
+        return to_bytes(''.join(out))
+
+    def loads(self, data):
+        try:
+            root = parse(data)
+            if root[0].tag == 'fault':
+                fault = decode_value(root[0][0])
+                raise Fault(fault['faultCode'], fault['faultString'])
+            return tuple(
+                decode_value(param[0], self.use_datetime)
+                for param in root[0]
+            )
+        except (Unsupported, SyntaxError, ValueError, IndexError,
+                KeyError, TypeError):
+            # Raises the error of xmlrpclib for malformed responses
+            return Codec.loads(self, data)
+
+
+def get_codec(use_datetime=False):
+    """
+    Return the fastest codec available
+    """
+    return FastCodec(use_datetime)
+
+
+class ServerProxy(BaseServerProxy):
+    """
+    ServerProxy encoding its requests with the codec of its transport,
+    eg: a :class:`magento.transport.PooledTransport`
+    """
+
+    def _ServerProxy__request(self, methodname, params):
+        response = self._ServerProxy__transport.request(
+            self._ServerProxy__host, self._ServerProxy__handler,
+            self._ServerProxy__transport.codec.dumps(params, methodname),
+            verbose=self._ServerProxy__verbose,
+        )
+        if len(response) == 1:
+            response = response[0]
+        return response
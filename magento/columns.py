@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+'''
+    magento.columns
+
+    Columnar results of the list calls, for analytics with NumPy or
+    Arrow
+
+    :license: BSD, see LICENSE for more details
+'''
+from array import array
+
+from magento.records import to_decimal, to_float, to_int
+
+
+def int64_typecode():
+    """
+    Return the typecode of 64 bit integers of `array`: 'q' from python
+    3.3, else 'l' where longs are 64 bit. None when there is none, eg:
+    python 2 on Windows.
+    """
+    for typecode in ('q', 'l'):
+        try:
+            if array(typecode).itemsize == 8:
+                return typecode
+        except ValueError:
+            # Typecode unknown to this python
+            pass
+    return None
+
+
+INT64_TYPECODE = int64_typecode()
+
+#: Columns of the typed buffers, by the converter of the record field
+KINDS = {
+    to_int: 'int',
+    to_float: 'float',
+    # Amounts are aggregated, which needs floats rather than Decimals
+    to_decimal: 'float',
+}
+
+
+def column_types(record_type):
+    """
+    Return the kinds of the numeric columns of a record type, eg:
+    `{'price': 'float'}` for :class:`magento.records.ProductRecord`
+    """
+    return dict(
+        (name, KINDS[convert])
+        for name, convert in record_type.types.items()
+        if convert in KINDS
+    )
+
+
+class Column(object):
+    """
+    Values of one field. Numbers are stored in a typed `array.array`,
+    with a validity flag per value, other values in a `list`.
+    """
+    __slots__ = ('name', 'kind', 'values', 'valid', 'nulls')
+
+    def __init__(self, name, kind=None, length=0):
+        """
+        :param name: Name of the field
+        :param kind: 'int', 'float' or None for any other value
+        :param length: Number of missing values the column starts with
+        """
+        if kind == 'int' and INT64_TYPECODE is None:
+            # Integers are then kept as they are, like other values
+            kind = None
+        self.name = name
+        self.kind = kind
+        if kind == 'int':
+            self.values = array(INT64_TYPECODE)
+        elif kind == 'float':
+            self.values = array('d')
+        else:
+            self.values = []
+        self.valid = bytearray()
+        self.nulls = 0
+        for index in range(length):
+            self.append(None)
+
+    def append(self, value):
+        if self.kind is not None:
+            try:
+                if value is None or value == '':
+                    value = None
+                elif self.kind == 'int':
+                    value = int(value)
+                else:
+                    value = float(value)
+            except (TypeError, ValueError):
+                value = None
+            if value is None:
+                self.values.append(0)
+                self.valid.append(0)
+                self.nulls += 1
+                return
+        elif value is None:
+            self.nulls += 1
+        self.values.append(value)
+        self.valid.append(value is not None)
+
+    def __len__(self):
+        return len(self.values)
+
+    def bitmap(self):
+        """
+        Return the validity bitmap of the column in the layout of Arrow
+        """
+        bits = bytearray((len(self.valid) + 7) // 8)
+        for index, valid in enumerate(self.valid):
+            if valid:
+                bits[index >> 3] |= 1 << (index & 7)
+        return bytes(bits)
+
+
+class Columns(object):
+    """
+    Records of a list call stored by column instead of as one `dict`
+    per record. Records are added as they are decoded, so that only one
+    page of them is held as `dict` at any time.
+
+    Numeric fields go in typed buffers, which :meth:`to_numpy` and
+    :meth:`to_arrow` hand over without copying them when no value is
+    missing.
+    """
+
+    def __init__(self, types=None):
+        """
+        :param types: `dict` of the kind of the numeric columns, 'int' or
+                      'float', eg: the result of :func:`column_types`
+        """
+        self.types = types or {}
+        self.columns = {}
+        self.names = []
+        self.length = 0
+
+    @classmethod
+    def build(cls, records, record_type=None):
+        """
+        Return the columns of an iterable of records
+
+        :param record_type: A :class:`magento.records.Record` subclass
+                            giving the numeric columns
+        """
+        columns = cls(record_type and column_types(record_type))
+        columns.extend(records)
+        return columns
+
+    def append(self, record):
+        """
+        Add a record, a `dict` returned by magento
+        """
+        columns = self.columns
+        for name, value in record.items():
+            column = columns.get(name)
+            if column is None:
+                column = columns[name] = Column(
+                    name, self.types.get(name), self.length
+                )
+                self.names.append(name)
+            column.append(value)
+        self.length += 1
+        if len(record) != len(columns):
+            for column in columns.values():
+                if len(column) < self.length:
+                    column.append(None)
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, name):
+        """
+        Return the values of a column, an `array.array` for numbers
+        """
+        return self.columns[name].values
+
+    def to_numpy(self):
+        """
+        Return a `dict` of NumPy arrays by column name. Numeric columns
+        with missing values are masked arrays.
+        """
+        import numpy
+
+        result = {}
+        for name in self.names:
+            column = self.columns[name]
+            if column.kind is None:
+                values = numpy.empty(len(column), dtype=object)
+                values[:] = column.values
+            else:
+                values = numpy.frombuffer(
+                    column.values, dtype=column.kind == 'int' and
+                    numpy.int64 or numpy.float64,
+                )
+                if column.nulls:
+                    values = numpy.ma.masked_array(
+                        values, mask=numpy.frombuffer(
+                            column.valid, dtype=numpy.uint8
+                        ) == 0,
+                    )
+            result[name] = values
+        return result
+
+    def to_arrow(self):
+        """
+        Return the columns as a `pyarrow.Table`
+        """
+        import pyarrow
+
+        arrays = []
+        for name in self.names:
+            column = self.columns[name]
+            if column.kind is None:
+                arrays.append(pyarrow.array(column.values))
+                continue
+            arrays.append(pyarrow.Array.from_buffers(
+                column.kind == 'int' and pyarrow.int64() or
+                pyarrow.float64(),
+                len(column), [
+                    column.nulls and pyarrow.py_buffer(column.bitmap()) or
+                    None,
+                    pyarrow.py_buffer(column.values),
+                ], null_count=column.nulls,
+            ))
+        return pyarrow.Table.from_arrays(arrays, names=list(self.names))
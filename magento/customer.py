@@ -8,6 +8,8 @@
     :license: BSD, see LICENSE for more details
 '''
 from magento.api import API
+from magento.columns import Columns
+from magento.records import CustomerRecord
 
 
 class Customer(API):
@@ -23,7 +25,7 @@ class Customer(API):
     """
     __slots__ = ()
 
-    def list(self, filters=None):
+    def list(self, filters=None, as_records=False, as_columns=False):
         """
         Retreive list of customers
 
@@ -32,9 +34,38 @@ class Customer(API):
             Format: `{<attribute>:{<operator>:<value>}}`
 
             Example: `{'firstname':{'ilike':'sharoon'}}`
+        :param as_records: Return :class:`magento.records.CustomerRecord`
+                           instances instead of `dict`
+        :param as_columns: Return :class:`magento.columns.Columns`, built
+                           while the response is decoded
         :return: List of dictionaries of matching records
         """
-        return self.call('customer.list', filters and [filters] or [{}])
+        if as_columns:
+            return Columns.build(self.iter_list(filters), CustomerRecord)
+        customers = self.call(
+            'customer.list', filters and [filters] or [{}]
+        )
+        if as_records:
+            return CustomerRecord.convert(customers)
+        return customers
+
+    def iter_list(self, filters=None, as_records=False):
+        """
+        Iterate over the customers matching the filters. Unlike :meth:`list`,
+        records are decoded one at a time while the response is read.
+
+        :param filters: Dictionary of filters, as for :meth:`list`
+        :param as_records: Yield :class:`magento.records.CustomerRecord`
+                           instances instead of `dict`
+
+        :return: iterator of `dict`
+        """
+        customers = self.iter_call(
+            'customer.list', filters and [filters] or [{}]
+        )
+        if as_records:
+            return CustomerRecord.convert_iter(customers)
+        return customers
 
     def create(self, data):
         """
@@ -45,17 +76,41 @@ class Customer(API):
         """
         return int(self.call('customer.create', [data]))
 
-    def info(self, id, attributes=None):
+    def info(self, id, attributes=None, as_records=False):
         """
         Retrieve customer data
 
         :param id: ID of customer
         :param attributes: `List` of attributes needed
+        :param as_records: Return a :class:`magento.records.CustomerRecord`
+                           instead of a `dict`
         """
         if attributes:
-            return self.call('customer.info', [id, attributes])
+            result = self.call('customer.info', [id, attributes])
         else:
-            return self.call('customer.info', [id])
+            result = self.call('customer.info', [id])
+        if as_records:
+            return CustomerRecord.convert(result)
+        return result
+
+    def info_multi(self, ids, attributes=None, as_records=False):
+        """
+        Retrieve data of several customers in parallel
+
+        :param ids: List of IDs of customers
+        :param attributes: `List` of attributes needed
+        :param as_records: Return :class:`magento.records.CustomerRecord`
+                           instances instead of `dict`
+        :return: `list` of `dict`, with the exception raised in place of
+                 every customer which could not be retrieved
+        """
+        results = self.call_parallel([
+            ['customer.info', attributes and [id, attributes] or [id]]
+            for id in ids
+        ])
+        if as_records:
+            return CustomerRecord.convert(results)
+        return results
 
     def update(self, id, data):
         """
@@ -67,6 +122,19 @@ class Customer(API):
         """
         return self.call('customer.update', [id, data])
 
+    def update_multi(self, id_data_pairs):
+        """
+        Update several customers in parallel
+
+        :param id_data_pairs: List of pairs of customer ID and dictionary
+                              of values
+        :return: `list` of results, with the exception raised in place of
+                 every customer which could not be updated
+        """
+        return self.call_parallel([
+            ['customer.update', [id, data]] for id, data in id_data_pairs
+        ])
+
     def delete(self, id):
         """
         Delete a customer
@@ -125,6 +193,18 @@ class CustomerAddress(API):
         """
         return self.call('customer_address.info', [id])
 
+    def info_multi(self, ids):
+        """
+        Retrieve data of several customer addresses in parallel
+
+        :param ids: List of IDs of customer addresses
+        :return: `list` of `dict`, with the exception raised in place of
+                 every address which could not be retrieved
+        """
+        return self.call_parallel([
+            ['customer_address.info', [id]] for id in ids
+        ])
+
     def update(self, id, data):
         """
         Update a customer address using the given data
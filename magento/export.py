@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+'''
+    magento.export
+
+    Streams full product records from magento to NDJSON or CSV files
+
+    :license: BSD, see LICENSE for more details
+'''
+import csv
+import json
+import os
+
+from magento.api import Fault
+from magento.catalog import Inventory, Product
+from magento.utils import write_json
+
+
+class NDJSONWriter(object):
+    """
+    Writes records as one JSON document per line
+    """
+
+    def __init__(self, fileobj, fields=None):
+        self.fileobj = fileobj
+        self.fields = fields
+
+    def write(self, record):
+        if self.fields:
+            record = dict((f, record.get(f)) for f in self.fields)
+        self.fileobj.write(json.dumps(record, default=str))
+        self.fileobj.write('\n')
+
+
+class CSVWriter(object):
+    """
+    Writes records as CSV rows. Values which are lists or dictionaries,
+    like the images of a product, are written as JSON.
+
+    The header is only written to empty files, so that an export resumed
+    from a checkpoint can append to the file of the interrupted one.
+
+    Products do not all have the same attributes, so the columns must be
+    given as `fields` instead of being guessed from the first record.
+    """
+
+    def __init__(self, fileobj, fields=None):
+        if not fields:
+            raise ValueError('The fields of a CSV export must be given')
+        self.fileobj = fileobj
+        self.fields = fields
+        self.writer = None
+
+    def write(self, record):
+        if self.writer is None:
+            self.writer = csv.DictWriter(
+                self.fileobj, self.fields,
+                extrasaction='ignore',
+            )
+            if self.fileobj.tell() == 0:
+                self.writer.writeheader()
+        self.writer.writerow(dict(
+            (key, json.dumps(value, default=str))
+            if isinstance(value, (list, dict)) else (key, value)
+            for key, value in record.items()
+        ))
+
+
+WRITERS = {
+    'ndjson': NDJSONWriter,
+    'csv': CSVWriter,
+}
+
+
+class ProductExporter(object):
+    """
+    Exports full product records, fetched with :meth:`Product.info` and
+    optionally enriched with stock data, images and tier prices.
+
+    Products are fetched in batches of `batch_size` by parallel calls, and
+    every batch is written out before the next one is fetched, so memory
+    use does not depend on the size of the catalog. After each batch the
+    last exported product ID is saved in the checkpoint file, so an
+    interrupted export can be resumed::
+
+        exporter = ProductExporter(client, inventory=True, images=True)
+        with open('products.ndjson', 'a') as fileobj:
+            exporter.export(fileobj, checkpoint='products.checkpoint')
+
+    Products which magento fails to return (eg: deleted since the export
+    started) are skipped, and listed with the fault in :attr:`errors`.
+    When only their images or tier prices fail, they are exported with
+    None for those, and the fault is listed too.
+    """
+
+    def __init__(self, api, filters=None, store_view=None, attributes=None,
+                 inventory=False, images=False, tier_prices=False,
+                 batch_size=100, workers=None):
+        """
+        :param api: :class:`magento.api.API` to export from
+        :param filters: Filters of the products to export, in the format
+                        of :meth:`Product.list`
+        :param store_view: ID or Code of store view
+        :param attributes: List of product fields to fetch
+        :param inventory: Add the stock data as `stock_item`
+        :param images: Add the list of images as `images`
+        :param tier_prices: Add the tier prices as `tier_prices`
+        :param batch_size: Number of products fetched and written at once
+        :param workers: Number of parallel calls, defaults to the size of
+                        the connection pool of the API
+        """
+        self.api = api
+        self.filters = filters
+        self.store_view = store_view
+        self.attributes = attributes
+        self.inventory = inventory
+        self.images = images
+        self.tier_prices = tier_prices
+        self.batch_size = batch_size
+        self.workers = workers
+        self.errors = []
+
+    def product_ids(self, after=None):
+        """
+        Return the sorted IDs of the products to export. The list of
+        products is read as a stream, keeping only the IDs.
+
+        :param after: Only return IDs greater than this one
+        """
+        product_ids = (
+            int(product['product_id']) for product in
+            self.api.get_instance_of(Product).iter_list(
+                self.filters, self.store_view
+            )
+        )
+        if after is not None:
+            product_ids = (id for id in product_ids if id > after)
+        return sorted(product_ids)
+
+    def fetch(self, product_ids):
+        """
+        Return the full records of the given products
+        """
+        calls = [
+            [
+                'catalog_product.info',
+                [id, self.store_view, self.attributes, None]
+            ]
+            for id in product_ids
+        ]
+        if self.images:
+            calls.extend([
+                [
+                    'catalog_product_attribute_media.list',
+                    [id, self.store_view, None]
+                ]
+                for id in product_ids
+            ])
+        if self.tier_prices:
+            calls.extend([
+                ['catalog_product_attribute_tier_price.info', [id, None]]
+                for id in product_ids
+            ])
+        results = self.api.call_parallel(calls, self.workers)
+        for result in results:
+            if isinstance(result, Exception) and \
+                    not isinstance(result, Fault):
+                raise result
+
+        size = len(product_ids)
+        records = results[:size]
+        extra = results[size:]
+        if self.images:
+            self.add_field(product_ids, records, 'images', extra[:size])
+            extra = extra[size:]
+        if self.tier_prices:
+            self.add_field(product_ids, records, 'tier_prices', extra[:size])
+        if self.inventory:
+            stock_items = dict(
+                (int(item['product_id']), item) for item in
+                self.api.get_instance_of(Inventory).list(product_ids)
+            )
+            for id, record in zip(product_ids, records):
+                if isinstance(record, dict):
+                    record['stock_item'] = stock_items.get(id)
+
+        for id, record in zip(product_ids, records):
+            if isinstance(record, Exception):
+                self.errors.append((id, record))
+            else:
+                yield record
+
+    def add_field(self, product_ids, records, name, values):
+        """
+        Set a field of the records to the results of the calls fetching
+        it, or to None where the call failed
+        """
+        for id, record, value in zip(product_ids, records, values):
+            if not isinstance(record, dict):
+                continue
+            if isinstance(value, Exception):
+                self.errors.append((id, value))
+                value = None
+            record[name] = value
+
+    def __iter__(self):
+        """
+        Iterate over the full records of all the products to export
+        """
+        product_ids = self.product_ids()
+        for index in range(0, len(product_ids), self.batch_size):
+            for record in self.fetch(
+                    product_ids[index:index + self.batch_size]):
+                yield record
+
+    def export(self, fileobj, format='ndjson', fields=None, checkpoint=None):
+        """
+        Write the products to a file
+
+        :param fileobj: File object opened for writing text
+        :param format: 'ndjson' or 'csv'
+        :param fields: Fields written, by default all the fields for
+                       NDJSON. Required for CSV.
+        :param checkpoint: Path of the file holding the progress of the
+                           export. If it exists, the export starts after
+                           the last product exported.
+        :return: Number of products written
+        """
+        writer = WRITERS[format](fileobj, fields)
+        last_exported = self.read_checkpoint(checkpoint)
+        product_ids = self.product_ids(after=last_exported)
+        count = 0
+        for index in range(0, len(product_ids), self.batch_size):
+            batch = product_ids[index:index + self.batch_size]
+            for record in self.fetch(batch):
+                writer.write(record)
+                count += 1
+            fileobj.flush()
+            self.write_checkpoint(checkpoint, batch[-1])
+        return count
+
+    @staticmethod
+    def read_checkpoint(path):
+        """
+        Return the last product ID saved in the checkpoint file, if any
+        """
+        if not path or not os.path.exists(path):
+            return None
+        with open(path) as fileobj:
+            return json.load(fileobj)['last_product_id']
+
+    @staticmethod
+    def write_checkpoint(path, product_id):
+        """
+        Save the last exported product ID to the checkpoint file
+        """
+        if not path:
+            return
+        write_json(path, {'last_product_id': product_id})
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+'''
+    magento.metrics
+
+    Timing and metrics of the calls made to magento
+
+    :license: BSD, see LICENSE for more details
+'''
+import bisect
+import socket
+import threading
+
+#: State of the request being made by the current thread. The transports
+#: add the bytes they send and receive, and the API the retries it makes.
+exchange = threading.local()
+
+
+def start_exchange():
+    """
+    Reset the state of the request of the current thread
+    """
+    exchange.request_size = 0
+    exchange.response_size = 0
+    exchange.retries = 0
+
+
+def record_exchange(request_size, response_size):
+    """
+    Called by the transports to add the size in bytes of a request and of
+    its response to the current exchange
+    """
+    exchange.request_size = \
+        getattr(exchange, 'request_size', 0) + (request_size or 0)
+    exchange.response_size = \
+        getattr(exchange, 'response_size', 0) + (response_size or 0)
+
+
+def record_retry():
+    """
+    Called by the API when a call is made again
+    """
+    exchange.retries = getattr(exchange, 'retries', 0) + 1
+
+
+class CallEvent(object):
+    """
+    Describes one request made to magento, as given to observers
+    """
+    __slots__ = (
+        'resource_path', 'protocol', 'calls', 'request_size',
+        'response_size', 'latency', 'retries', 'fault_code', 'error',
+        'faults',
+    )
+
+    def __init__(self, resource_path, protocol, calls, request_size,
+                 response_size, latency, retries, fault_code=None,
+                 error=None, faults=0):
+        """
+        :param resource_path: Resource path called. For a multicall, the
+                              path shared by all its calls, or `multiCall`
+        :param protocol: 'xmlrpc', 'soap' or 'rest'
+        :param calls: Number of calls made by the request
+        :param request_size: Bytes sent, None if the transport does not
+                             tell
+        :param response_size: Bytes received, None if the transport does
+                              not tell
+        :param latency: Seconds the request took, retries included
+        :param retries: Number of times the request was sent again
+        :param fault_code: Code of the fault magento answered a single
+                           call with, None otherwise
+        :param error: The exception raised, if the request failed
+        :param faults: Number of calls magento answered with a fault, eg:
+                       the failed calls of a multicall
+        """
+        self.resource_path = resource_path
+        self.protocol = protocol
+        self.calls = calls
+        self.request_size = request_size
+        self.response_size = response_size
+        self.latency = latency
+        self.retries = retries
+        self.fault_code = fault_code
+        self.error = error
+        self.faults = faults
+
+
+class Observer(object):
+    """
+    Base class of the observers which can be added to an API with
+    :meth:`magento.api.API.add_observer`
+    """
+
+    def observe(self, event):
+        """
+        Called after every request made to magento
+
+        :param event: :class:`CallEvent` describing the request
+        """
+        raise NotImplementedError
+
+
+#: Upper bounds in seconds of the latency histogram buckets
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+
+class Histogram(object):
+    """
+    Latency histogram of the calls to one resource path
+    """
+    __slots__ = ('buckets', 'counts', 'count', 'sum', 'errors', 'retries',
+                 'request_bytes', 'response_bytes')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.errors = 0
+        self.retries = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+
+    def add(self, event):
+        self.counts[bisect.bisect_left(self.buckets, event.latency)] += 1
+        self.count += 1
+        self.sum += event.latency
+        self.retries += event.retries
+        self.request_bytes += event.request_size or 0
+        self.response_bytes += event.response_size or 0
+        if event.error is not None or event.faults:
+            self.errors += 1
+
+    def percentile(self, fraction):
+        """
+        Return the upper bound of the bucket holding the given percentile
+        of the latencies, `inf` if it is above the largest bucket
+        """
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank and count:
+                return bound
+        return float('inf')
+
+
+class HistogramObserver(Observer):
+    """
+    Aggregates the latency of the calls per resource path in histograms
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """
+        :param buckets: Sorted upper bounds in seconds of the buckets
+        """
+        self.buckets = tuple(buckets)
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def observe(self, event):
+        with self.lock:
+            histogram = self.histograms.get(event.resource_path)
+            if histogram is None:
+                histogram = self.histograms[event.resource_path] = \
+                    Histogram(self.buckets)
+            histogram.add(event)
+
+    def summary(self):
+        """
+        Return a `dict` of the count, mean, p50, p99, errors and retries of
+        the calls to every resource path
+        """
+        with self.lock:
+            return dict(
+                (path, {
+                    'count': histogram.count,
+                    'mean': histogram.sum / histogram.count,
+                    'p50': histogram.percentile(0.5),
+                    'p99': histogram.percentile(0.99),
+                    'errors': histogram.errors,
+                    'retries': histogram.retries,
+                })
+                for path, histogram in self.histograms.items()
+            )
+
+    def prometheus(self, prefix='magento_call'):
+        """
+        Return the histograms in the Prometheus text exposition format
+        """
+        lines = [
+            '# TYPE %s_seconds histogram' % prefix,
+        ]
+        with self.lock:
+            for path, histogram in sorted(self.histograms.items()):
+                label = 'resource_path="%s"' % path
+                seen = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    seen += count
+                    lines.append('%s_seconds_bucket{%s,le="%s"} %d' % (
+                        prefix, label, bound, seen
+                    ))
+                lines.append('%s_seconds_bucket{%s,le="+Inf"} %d' % (
+                    prefix, label, histogram.count
+                ))
+                lines.append('%s_seconds_sum{%s} %f' % (
+                    prefix, label, histogram.sum
+                ))
+                lines.append('%s_seconds_count{%s} %d' % (
+                    prefix, label, histogram.count
+                ))
+                for name in ('errors', 'retries', 'request_bytes',
+                             'response_bytes'):
+                    lines.append('%s_%s_total{%s} %d' % (
+                        prefix, name, label, getattr(histogram, name)
+                    ))
+        return '\n'.join(lines) + '\n'
+
+
+class StatsdObserver(Observer):
+    """
+    Sends the metrics of every call to a StatsD server over UDP
+    """
+
+    def __init__(self, host='localhost', port=8125, prefix='magento'):
+        """
+        :param host: Host of the StatsD server
+        :param port: Port of the StatsD server
+        :param prefix: Prefix of the metric names
+        """
+        self.address = (host, port)
+        self.prefix = prefix
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def observe(self, event):
+        name = '%s.%s' % (self.prefix, event.resource_path.replace('.', '_'))
+        metrics = ['%s.latency:%d|ms' % (name, event.latency * 1000)]
+        if event.response_size is not None:
+            metrics.append('%s.response_bytes:%d|h' % (
+                name, event.response_size
+            ))
+        if event.retries:
+            metrics.append('%s.retries:%d|c' % (name, event.retries))
+        if event.error is not None or event.faults:
+            metrics.append('%s.errors:1|c' % name)
+        try:
+            self.socket.sendto(
+                '\n'.join(metrics).encode('utf-8'), self.address
+            )
+        except socket.error:
+            pass
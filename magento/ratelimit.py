@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+'''
+    magento.ratelimit
+
+    Client side limits on the rate and concurrency of the requests made
+    to magento
+
+    :license: BSD, see LICENSE for more details
+'''
+import os
+import time
+from threading import BoundedSemaphore, Lock
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class RateLimiter(object):
+    """
+    Limits the requests made to magento by the threads of one process.
+
+    Requests are spread with a token bucket: the bucket holds up to
+    `burst` tokens and gets `rate` tokens per second. Every request, a
+    multicall included, takes one token and waits for it if the bucket is
+    empty. At most `max_in_flight` requests are sent at the same time.
+
+    Give the limiter to :class:`magento.api.API`, it is then shared by
+    all its sub APIs::
+
+        limiter = RateLimiter(rate=20, max_in_flight=4)
+        with API(url, username, password, rate_limiter=limiter) as api:
+            ...
+    """
+
+    def __init__(self, rate=None, burst=None, max_in_flight=None):
+        """
+        :param rate: Requests per second, None for no limit
+        :param burst: Requests which can be made at once after a pause.
+                      Defaults to `rate`, and at least 1.
+        :param max_in_flight: Maximum number of concurrent requests, None
+                              for no limit
+        """
+        self.rate = rate
+        self.burst = burst or max(1, int(rate or 1))
+        self.max_in_flight = max_in_flight
+        self.tokens = float(self.burst)
+        self.updated = time.time()
+        self.lock = Lock()
+        self.slots = max_in_flight and BoundedSemaphore(max_in_flight)
+
+    def take(self, tokens, updated):
+        """
+        Take a token from a bucket holding `tokens` at time `updated`.
+
+        Tokens are taken in advance, so the bucket may go below zero. The
+        requests then wait in turn for the tokens they took.
+
+        :return: The tokens left, the time of the update and the seconds
+                 to wait for the token
+        """
+        now = time.time()
+        tokens = min(
+            self.burst, tokens + max(0, now - updated) * self.rate
+        ) - 1
+        return tokens, now, tokens < 0 and -tokens / self.rate or 0
+
+    def reserve(self):
+        """
+        Take a token and return the seconds to wait before using it
+        """
+        with self.lock:
+            self.tokens, self.updated, wait = self.take(
+                self.tokens, self.updated
+            )
+        return wait
+
+    def acquire(self):
+        """
+        Wait for a request to be allowed in flight
+        """
+        if self.slots:
+            self.slots.acquire()
+
+    def release(self, slot):
+        """
+        Release the slot returned by :meth:`acquire`
+        """
+        if self.slots:
+            self.slots.release()
+
+    def run(self, request, *args):
+        """
+        Run `request(*args)` within the limits
+        """
+        slot = self.acquire()
+        try:
+            if self.rate:
+                wait = self.reserve()
+                if wait:
+                    time.sleep(wait)
+            return request(*args)
+        finally:
+            self.release(slot)
+
+    def run_stream(self, request, *args):
+        """
+        Run `request(*args)`, which returns an iterator over a response
+        still being read, within the limits. The request is in flight
+        until the iterator is exhausted or closed, so it keeps its slot
+        until then.
+        """
+        slot = self.acquire()
+        try:
+            if self.rate:
+                wait = self.reserve()
+                if wait:
+                    time.sleep(wait)
+            items = request(*args)
+        except BaseException:
+            self.release(slot)
+            raise
+        stream = self.hold(slot, items)
+        # Enter the generator, so that closing it, or dropping it, before
+        # it is iterated releases the slot too
+        next(stream)
+        return stream
+
+    def hold(self, slot, items):
+        """
+        Yield None, and then the items, releasing the slot once done
+        """
+        try:
+            yield
+            for item in items:
+                yield item
+        finally:
+            self.release(slot)
+
+
+class FileRateLimiter(RateLimiter):
+    """
+    A :class:`RateLimiter` whose limits are shared by all the processes
+    using the same `path`, eg: the workers of a task queue on one box.
+
+    The token bucket is kept in the file at `path`, and every in flight
+    request holds a lock on one of the files `<path>.0` to
+    `<path>.<max_in_flight - 1>`. Locks are released by the system when a
+    process dies, so a crashed worker does not use up the budget.
+
+    Only available on systems with `fcntl`.
+    """
+
+    #: Seconds between attempts to get a slot when all are taken
+    poll_interval = 0.005
+
+    def __init__(self, path, rate=None, burst=None, max_in_flight=None):
+        """
+        :param path: Path of the file holding the shared state
+        """
+        if fcntl is None:
+            raise RuntimeError('FileRateLimiter needs fcntl')
+        super(FileRateLimiter, self).__init__(rate, burst, max_in_flight)
+        self.path = path
+        self.slots = None
+        self._files = None
+        self._free = []
+        self._pid = None
+
+    @property
+    def files(self):
+        """
+        The file descriptors of the bucket and of the slots. Files are
+        opened again in forked processes, since locks are held per open
+        file.
+        """
+        if self._files is None or self._pid != os.getpid():
+            self._files = [os.open(self.path, os.O_RDWR | os.O_CREAT)] + [
+                os.open('%s.%d' % (self.path, index),
+                        os.O_RDWR | os.O_CREAT)
+                for index in range(self.max_in_flight or 0)
+            ]
+            self._free = list(range(1, len(self._files)))
+            self._pid = os.getpid()
+        return self._files
+
+    def reserve(self):
+        with self.lock:
+            fd = self.files[0]
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                os.lseek(fd, 0, os.SEEK_SET)
+                state = os.read(fd, 64).split()
+                if len(state) == 2:
+                    tokens, updated = float(state[0]), float(state[1])
+                else:
+                    tokens, updated = self.burst, time.time()
+                tokens, updated, wait = self.take(tokens, updated)
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.ftruncate(fd, 0)
+                os.write(fd, ('%r %r' % (tokens, updated)).encode('ascii'))
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        return wait
+
+    def acquire(self):
+        if not self.max_in_flight:
+            return None
+        while True:
+            with self.lock:
+                files = self.files
+                for slot in self._free:
+                    try:
+                        fcntl.flock(files[slot], fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except (IOError, OSError):
+                        continue
+                    self._free.remove(slot)
+                    return slot
+            time.sleep(self.poll_interval)
+
+    def release(self, slot):
+        if slot is None:
+            return
+        with self.lock:
+            fcntl.flock(self.files[slot], fcntl.LOCK_UN)
+            self._free.append(slot)
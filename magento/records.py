@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+'''
+    magento.records
+
+    Compact record types for the products, orders, customers and stock
+    items returned by magento
+
+    :license: BSD, see LICENSE for more details
+'''
+import sys
+from decimal import Decimal, InvalidOperation
+
+if sys.version_info < (3, 0):
+    from __builtin__ import intern
+else:
+    from sys import intern
+
+
+def intern_string(value):
+    """
+    Return the interned copy of a string, so that a value repeated in many
+    records is stored once
+    """
+    try:
+        return intern(value)
+    except TypeError:
+        return value
+
+
+def converter(type_):
+    """
+    Return a function converting the strings magento returns to `type_`.
+    Empty values become None, and values which cannot be converted are
+    kept as they are.
+    """
+    def convert(value):
+        if value is None or value == '':
+            return None
+        try:
+            return type_(value)
+        except (TypeError, ValueError, InvalidOperation):
+            return value
+    return convert
+
+
+to_int = converter(int)
+to_float = converter(float)
+to_decimal = converter(Decimal)
+
+
+def to_ints(values):
+    """
+    Convert a list of IDs, eg: `category_ids`
+    """
+    if not isinstance(values, list):
+        return values
+    return [to_int(value) for value in values]
+
+
+class Record(object):
+    """
+    A record returned by magento, with its usual fields stored in slots
+    instead of a `dict`. Numbers are converted once when the record is
+    built, and the values of fields like the status, which repeat across
+    records, are interned.
+
+    Fields not declared by the record type are kept in the `extra` dict.
+    Records can still be read like the `dict` they replace, eg:
+    `record['sku']`. Declared fields magento did not return read as None,
+    but are left out of `in`, :meth:`keys` and :meth:`to_dict`.
+    """
+    __slots__ = ('extra',)
+
+    #: Names of the fields stored in slots
+    fields = ()
+
+    #: Converters of the fields which are not strings
+    types = {}
+
+    #: Fields whose values are interned
+    interned = ()
+
+    def __init__(self, data):
+        """
+        :param data: `dict` returned by magento
+        """
+        extra = None
+        types = self.types
+        for key, value in data.items():
+            if key not in self.fields:
+                if extra is None:
+                    extra = {}
+                extra[intern_string(key)] = value
+                continue
+            if key in types:
+                value = types[key](value)
+            elif key in self.interned:
+                value = intern_string(value)
+            setattr(self, key, value)
+        self.extra = extra
+
+    def __getattr__(self, name):
+        # Called for the fields magento did not return
+        if name in self.fields:
+            return None
+        raise AttributeError(name)
+
+    @classmethod
+    def convert(cls, value):
+        """
+        Return `value` as records: a `dict` as a record, a `list` as a
+        list of records. Anything else, like a fault returned in place of
+        a record, is returned unchanged.
+        """
+        if isinstance(value, dict):
+            return cls(value)
+        if isinstance(value, list):
+            return [cls.convert(item) for item in value]
+        return value
+
+    @classmethod
+    def convert_iter(cls, values):
+        """
+        Iterate over records converted from an iterator of `dict`
+        """
+        for value in values:
+            yield cls.convert(value)
+
+    def __getitem__(self, key):
+        if key in self.fields:
+            return getattr(self, key)
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def has_field(self, name):
+        """
+        Tell if a declared field was set, reading its slot directly since
+        attribute access gives None for the missing ones
+        """
+        try:
+            getattr(type(self), name).__get__(self)
+        except AttributeError:
+            return False
+        return True
+
+    def set_fields(self):
+        """
+        Return the names of the declared fields which were set
+        """
+        return [name for name in self.fields if self.has_field(name)]
+
+    def __contains__(self, key):
+        if key in self.fields:
+            return self.has_field(key)
+        return self.extra is not None and key in self.extra
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return self.set_fields() + list(self.extra or ())
+
+    def to_dict(self):
+        """
+        Return the fields of the record as a `dict`, with converted values
+        """
+        result = dict(
+            (name, getattr(self, name)) for name in self.set_fields()
+        )
+        result.update(self.extra or {})
+        return result
+
+    def __getstate__(self):
+        # The default state of slots reads them through __getattr__, which
+        # would set the fields magento did not return to None
+        return dict(
+            (name, getattr(self, name)) for name in self.set_fields()
+        ), self.extra
+
+    def __setstate__(self, state):
+        fields, self.extra = state
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and \
+            self.to_dict() == other.to_dict()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return '<%s %r>' % (self.__class__.__name__, self.to_dict())
+
+
+class ProductRecord(Record):
+    """
+    Product, as returned by `catalog_product.info` and
+    `catalog_product.list`
+    """
+    __slots__ = fields = (
+        'product_id', 'sku', 'set', 'type', 'name', 'price',
+        'special_price', 'cost', 'weight', 'status', 'visibility',
+        'tax_class_id', 'category_ids', 'website_ids', 'url_key',
+        'description', 'short_description', 'created_at', 'updated_at',
+    )
+    types = {
+        'product_id': to_int,
+        'price': to_decimal,
+        'special_price': to_decimal,
+        'cost': to_decimal,
+        'weight': to_float,
+        'status': to_int,
+        'visibility': to_int,
+        'tax_class_id': to_int,
+        'category_ids': to_ints,
+        'website_ids': to_ints,
+    }
+    interned = ('set', 'type')
+
+
+class OrderRecord(Record):
+    """
+    Order, as returned by `sales_order.info`, `sales_order.list` and
+    `sales_order.search`
+    """
+    __slots__ = fields = (
+        'order_id', 'increment_id', 'status', 'state', 'store_id',
+        'customer_id', 'customer_email', 'customer_firstname',
+        'customer_lastname', 'customer_group_id', 'grand_total',
+        'subtotal', 'tax_amount', 'shipping_amount', 'discount_amount',
+        'total_paid', 'total_qty_ordered', 'order_currency_code',
+        'shipping_method', 'created_at', 'updated_at',
+    )
+    types = {
+        'order_id': to_int,
+        'store_id': to_int,
+        'customer_id': to_int,
+        'customer_group_id': to_int,
+        'grand_total': to_decimal,
+        'subtotal': to_decimal,
+        'tax_amount': to_decimal,
+        'shipping_amount': to_decimal,
+        'discount_amount': to_decimal,
+        'total_paid': to_decimal,
+        'total_qty_ordered': to_float,
+    }
+    interned = (
+        'status', 'state', 'order_currency_code', 'shipping_method',
+    )
+
+
+class CustomerRecord(Record):
+    """
+    Customer, as returned by `customer.info` and `customer.list`
+    """
+    __slots__ = fields = (
+        'customer_id', 'email', 'firstname', 'lastname', 'group_id',
+        'store_id', 'website_id', 'created_in', 'created_at',
+        'updated_at',
+    )
+    types = {
+        'customer_id': to_int,
+        'group_id': to_int,
+        'store_id': to_int,
+        'website_id': to_int,
+    }
+    interned = ('created_in',)
+
+
+class StockRecord(Record):
+    """
+    Stock item, as returned by `cataloginventory_stock_item.list`
+    """
+    __slots__ = fields = ('product_id', 'sku', 'qty', 'is_in_stock')
+    types = {
+        'product_id': to_int,
+        'qty': to_float,
+        'is_in_stock': to_int,
+    }
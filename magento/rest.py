@@ -1,22 +1,550 @@
 # coding: utf-8
+import numbers
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 try:
     import requests
+    from requests.adapters import HTTPAdapter
     import json
 except ImportError:
     pass
 
+if sys.version_info < (3, 0):
+    from urllib import quote
+    from xmlrpclib import Fault
+else:
+    from urllib.parse import quote
+    from xmlrpc.client import Fault
+
+from magento.metrics import record_exchange
+from magento.utils import iter_pages
+
+#: HTTP methods a resource path can start with, eg: `PUT products/sku`
+METHODS = ('GET', 'POST', 'PUT', 'DELETE')
+
+#: Statuses of the operations of a bulk request
+STATUS_COMPLETE = 1
+STATUS_FAILED_RETRIABLY = 2
+STATUS_FAILED = 3
+STATUS_OPEN = 4
+STATUS_REJECTED = 5
+
+
+#: Operators of the filters of magento 1 whose condition type has another
+#: name in the searchCriteria of magento 2
+CONDITION_TYPES = {
+    'ilike': 'like',
+    'nilike': 'nlike',
+    'seq': 'eq',
+    'sneq': 'neq',
+    'is': 'null',
+}
+
+
+def filter_value(value):
+    """
+    Return a value of a filter as the string searchCriteria expects, eg:
+    a comma separated list for the `in` operator
+    """
+    if isinstance(value, (list, tuple, set)):
+        return ','.join(filter_value(item) for item in value)
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return value and '1' or '0'
+    return '%s' % value
+
+
+def search_criteria(filters=None, page_size=None, current_page=None,
+                    sort_orders=None):
+    """
+    Translate filters in the format of the list calls of magento 1, eg:
+    `{'updated_at': {'from': '2026-01-01'}, 'status': 'pending'}`, to the
+    query parameters of a searchCriteria of magento 2.
+
+    Every condition gets a filter group of its own, since magento joins
+    the groups with AND and the filters of a group with OR.
+
+    :param filters: `{<attribute>: {<operator>: <value>}}`, or
+                    `{<attribute>: <value>}` for equality
+    :param page_size: Number of records per page
+    :param current_page: Number of the page, from 1
+    :param sort_orders: List of `(<attribute>, 'ASC' or 'DESC')` pairs
+    :return: `dict` of query parameters
+    """
+    params = {}
+    group = 0
+    for field, conditions in sorted((filters or {}).items()):
+        if not isinstance(conditions, dict):
+            conditions = {'eq': conditions}
+        for operator, value in sorted(conditions.items()):
+            prefix = 'searchCriteria[filter_groups][%d][filters][0]' % group
+            params[prefix + '[field]'] = field
+            params[prefix + '[value]'] = filter_value(value)
+            params[prefix + '[condition_type]'] = \
+                CONDITION_TYPES.get(operator, operator)
+            group += 1
+    for index, (field, direction) in enumerate(sort_orders or []):
+        prefix = 'searchCriteria[sortOrders][%d]' % index
+        params[prefix + '[field]'] = field
+        params[prefix + '[direction]'] = direction.upper()
+    if page_size is not None:
+        params['searchCriteria[pageSize]'] = page_size
+    if current_page is not None:
+        params['searchCriteria[currentPage]'] = current_page
+    return params
+
+
+def split_method(resource_path):
+    """
+    Return the HTTP method and the path of a resource path, eg:
+    `('PUT', 'products/sku')` for `PUT products/sku`. Paths without a
+    method are read with GET.
+    """
+    method, _, path = resource_path.partition(' ')
+    if path and method in METHODS:
+        return method, path
+    return 'GET', resource_path
+
+
+def is_magento1_path(resource_path):
+    """
+    Check if a resource path is one of the API of magento 1, eg:
+    `catalog_product.info`, rather than a path of the REST API
+    """
+    return '.' in resource_path and '/' not in resource_path and \
+        ' ' not in resource_path
+
+
+def first_order(result):
+    items = (result or {}).get('items') or []
+    if not items:
+        raise Fault(100, 'Requested order not exists.')
+    return items[0]
+
+
+def product_sku(product):
+    """
+    Return the SKU of a product given to a call of magento 1, which takes
+    an ID or a SKU. The REST API only addresses products by SKU, so an
+    integer ID raises a `ValueError` instead of being taken for a SKU.
+    """
+    if isinstance(product, numbers.Integral):
+        raise ValueError(
+            'Products are identified by SKU in the REST API, got the ID '
+            '%s' % product
+        )
+    return '%s' % product
+
+
+#: Requests of the REST API answering the calls of magento 1 made by the
+#: sub APIs. Every function takes the arguments of the call and returns
+#: the resource path and the arguments of the REST request, and a function
+#: converting its response or None.
+TRANSLATIONS = {
+    # The stock item ID in the path is ignored by magento, which updates
+    # the default stock item of the product
+    'cataloginventory_stock_item.update': lambda product, data: (
+        'PUT products/%s/stockItems/1' % quote(
+            product_sku(product), safe=''
+        ),
+        {'stockItem': data}, bool,
+    ),
+    # orders/{id} takes the entity ID, the API of magento 1 the
+    # increment ID
+    'sales_order.info': lambda increment_id: (
+        'orders', search_criteria(
+            {'increment_id': increment_id}, page_size=1, current_page=1
+        ), first_order,
+    ),
+}
+
+#: Bulk endpoints replacing many calls of magento 1 to the same resource:
+#: the HTTP method, the path and a function returning the payload of the
+#: arguments of a call
+BULK_ENDPOINTS = {
+    'cataloginventory_stock_item.update': (
+        'PUT', 'products/byProductSku/stockItems/byItemId',
+        lambda product, data: {
+            'productSku': product_sku(product), 'itemId': 1,
+            'stockItem': data,
+        },
+    ),
+}
+
+
+def translate(resource_path, arguments):
+    """
+    Return the resource path and the arguments of the REST request
+    answering a call, and a function converting its response or None.
+    Paths of the REST API are returned as they are.
+
+    :raises ValueError: For the calls of magento 1 the REST API has no
+                        equivalent for
+    """
+    if not is_magento1_path(resource_path):
+        return resource_path, arguments, None
+    translation = TRANSLATIONS.get(resource_path)
+    if translation is None:
+        raise ValueError(
+            '%s has no equivalent in the REST API' % resource_path
+        )
+    return translation(*(arguments or []))
+
+
+def url_for(url, path):
+    """
+    Return the URL of a path of the REST API at `url`, eg:
+    `http://domain.com/rest/V1`
+    """
+    if path.startswith('async/'):
+        return '%s/%s' % (url.rsplit('/', 1)[0], path)
+    return '%s/%s' % (url, path)
+
+
+def get_fault(exc):
+    """
+    Return the error magento reported for a request as a `Fault`, like the
+    faults of a multicall, or None if `exc` is not an error of the request
+    itself, eg: a timeout or a server error.
+
+    :param exc: Exception raised by :meth:`Client.call`
+    """
+    response = getattr(exc, 'response', None)
+    if response is None or not 400 <= response.status_code < 500:
+        return None
+    try:
+        message = response.json().get('message')
+    except (ValueError, AttributeError):
+        message = None
+    return Fault(response.status_code, message or response.reason or '')
+
 
 class Client(object):
+    """
+    Client for the REST API of magento 2.
 
-    def __init__(self, url, token, verify_ssl=True):
+    All the requests go through one `requests.Session`, so connections to
+    magento are kept alive and pooled. :class:`magento.api.API` shares a
+    single client between all its sub APIs.
+    """
+
+    def __init__(self, url, token, verify_ssl=True, pool_connections=10,
+                 pool_maxsize=10, pool_block=False, max_retries=3,
+                 keep_alive=True):
+        """
+        :param url: URL of the REST API, eg: http://domain.com/rest/V1
+        :param token: Authentication token
+        :param verify_ssl: skip SSL validation if False
+        :param pool_connections: Number of per host connection pools to
+                                 cache
+        :param pool_maxsize: Maximum number of connections kept open per
+                             host
+        :param pool_block: If True, wait for a free connection instead of
+                           opening connections beyond `pool_maxsize`
+        :param max_retries: Number of times failed connection attempts are
+                            retried, or a `urllib3.util.Retry` instance
+        :param keep_alive: If False, connections are closed after every
+                           request
+        """
         self._url = url
         self._token = token
         self._verify_ssl = verify_ssl
+        self.pool_maxsize = pool_maxsize
+
+        self.session = requests.Session()
+        self.session.verify = verify_ssl
+        self.session.headers['Authorization'] = 'Bearer %s' % token
+        if not keep_alive:
+            self.session.headers['Connection'] = 'close'
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            max_retries=max_retries,
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def url_for(self, path):
+        """
+        Return the URL of a path of the API, eg: `products`. Paths of the
+        asynchronous API, eg: `async/bulk/V1/products`, are relative to the
+        root of the REST API rather than to its version.
+        """
+        return url_for(self._url, path)
 
     def call(self, resource_path, arguments):
-        url = '%s/%s' % (self._url, resource_path)
-        res = requests.get(
-            url, params=arguments, verify=self._verify_ssl,
-            headers={'Authorization': 'Bearer %s' % self._token})
+        """
+        Send a request to the REST API and return its decoded response
+
+        :param resource_path: Path of the resource, optionally preceded by
+                              the HTTP method, eg: `PUT products/sku`.
+                              Requests are sent with GET by default.
+        :param arguments: Query parameters for GET and DELETE, body of the
+                          request, sent as JSON, for POST and PUT
+        """
+        method, path = split_method(resource_path)
+        if method in ('GET', 'DELETE'):
+            res = self.session.request(
+                method, self.url_for(path), params=arguments
+            )
+        else:
+            res = self.session.request(
+                method, self.url_for(path), json=arguments
+            )
+        record_exchange(
+            len(res.request.url) + len(res.request.body or ''),
+            len(res.content)
+        )
         res.raise_for_status()
+        if not res.content:
+            return None
         return res.json()
+
+    def get(self, path, params=None):
+        return self.call('GET %s' % path, params)
+
+    def post(self, path, data=None):
+        return self.call('POST %s' % path, data)
+
+    def put(self, path, data=None):
+        return self.call('PUT %s' % path, data)
+
+    def delete(self, path, params=None):
+        return self.call('DELETE %s' % path, params)
+
+    def iter_search(self, path, filters=None, fields=None, page_size=100,
+                    prefetch=False, sort_orders=None, call=None):
+        """
+        Iterate over all the records of a search endpoint, eg: `products`,
+        fetching them page by page. Only one page of records is in memory
+        at a time, and iteration stops once `total_count` records, as
+        reported by magento with the first page, were fetched.
+
+        :param path: Path of the search endpoint
+        :param filters: `{<attribute>: {<operator>: <value>}}`, see
+                        :func:`search_criteria`
+        :param fields: Names of the fields of the records to return, all
+                       of them if None
+        :param page_size: Number of records fetched per request
+        :param prefetch: Fetch the next page in the background while the
+                         current page is consumed
+        :param sort_orders: List of `(<attribute>, 'ASC' or 'DESC')` pairs
+        :param call: Function sending the requests, defaults to
+                     :meth:`call`
+        """
+        call = call or self.call
+        totals = []
+
+        def fetch_page(page):
+            params = search_criteria(filters, page_size, page, sort_orders)
+            if fields:
+                params['fields'] = 'items[%s],total_count' % ','.join(fields)
+            result = call(path, params) or {}
+            if result.get('total_count') is not None:
+                totals.append(int(result['total_count']))
+            return result.get('items') or []
+
+        return iter_pages(
+            fetch_page, page_size, prefetch=prefetch,
+            total=lambda: totals and totals[-1] or None,
+        )
+
+    def bulk(self, path, payloads, method='POST', call=None):
+        """
+        Submit many requests to the same endpoint at once, with the
+        asynchronous bulk API of magento, and return the
+        :class:`BulkOperation` to follow how magento processes them. The
+        requests are queued by magento and processed by its consumers,
+        which is far faster than one request each for large imports::
+
+            operation = client.bulk('products', [
+                {'product': product} for product in products
+            ])
+            results = operation.wait()
+
+        Parameters of the path are replaced by `by` and their name, and
+        their values are given in every payload, eg: to update stock
+        items::
+
+            client.bulk(
+                'products/byProductSku/stockItems/byItemId', [{
+                    'productSku': sku, 'itemId': 1,
+                    'stockItem': {'qty': qty, 'is_in_stock': True},
+                } for sku, qty in quantities], method='PUT',
+            )
+
+        :param path: Path of the endpoint, without the version, eg:
+                     `products`
+        :param payloads: `list` of the bodies of the requests
+        :param method: HTTP method of the endpoint
+        :param call: Function sending the request, defaults to :meth:`call`
+        """
+        call = call or self.call
+        response = call('%s async/bulk/%s/%s' % (
+            method, self._url.rsplit('/', 1)[1], path
+        ), list(payloads))
+        return BulkOperation(response, call)
+
+    def multiCall(self, calls, max_workers=None, call=None):
+        """
+        Make several calls at once. The REST API has no multicall, so every
+        call is a request of its own, sent over a pool of threads which
+        share the pooled connections of the session.
+
+        :param calls: List of `[resource_path, arguments]` pairs
+        :param max_workers: Maximum number of requests in flight, defaults
+                            to the size of the connection pool
+        :param call: Function making one call, defaults to :meth:`call`
+        :return: `list` aligned with `calls` of results, with a `Fault` in
+                 place of every call magento rejected and the exception
+                 raised in place of every other failed call
+        """
+        call = call or self.call
+
+        def send(resource_path_arguments):
+            try:
+                return call(*resource_path_arguments)
+            except Exception as exc:
+                return get_fault(exc) or exc
+
+        workers = min(max_workers or self.pool_maxsize, len(calls))
+        if workers <= 1:
+            return [send(item) for item in calls]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(send, calls))
+
+    def close(self):
+        """
+        Close all the connections of the session
+        """
+        self.session.close()
+
+
+class BulkTimeoutError(Exception):
+    """
+    Raised when the operations of a bulk request are not processed in
+    time
+    """
+
+
+class BulkOperation(object):
+    """
+    A bulk request accepted by magento, whose operations are processed
+    in the background
+    """
+
+    def __init__(self, response, call):
+        """
+        :param response: Response of magento to the bulk request
+        :param call: Function sending requests to the REST API
+        """
+        self.uuid = response['bulk_uuid']
+        self.request_items = response.get('request_items') or []
+        self.errors = response.get('errors')
+        self.call = call
+
+    def count(self, status):
+        """
+        Return the number of operations of the bulk with the given status,
+        eg: :data:`STATUS_OPEN`
+        """
+        return int(self.call(
+            'bulk/%s/operation-status/%d' % (self.uuid, status), None
+        ))
+
+    def status(self):
+        """
+        Return the detailed status of the bulk and of all its operations
+        """
+        return self.call('bulk/%s/detailed-status' % self.uuid, None)
+
+    def wait(self, timeout=None, interval=0.5, max_interval=10):
+        """
+        Wait until magento processed every operation and return their
+        results, see :meth:`results`.
+
+        Only the number of open operations, a tiny response, is polled,
+        with a delay doubling up to `max_interval` between two polls. The
+        detailed status is fetched once, at the end.
+
+        :param timeout: Seconds after which :class:`BulkTimeoutError` is
+                        raised, None to wait for ever
+        :param interval: Seconds before the first poll
+        :param max_interval: Maximum seconds between two polls
+        """
+        deadline = timeout is not None and time.time() + timeout or None
+        while self.count(STATUS_OPEN):
+            if deadline is not None and time.time() + interval > deadline:
+                raise BulkTimeoutError(
+                    'Bulk %s not processed in %ss' % (self.uuid, timeout)
+                )
+            time.sleep(interval)
+            interval = min(interval * 2, max_interval)
+        return self.results()
+
+    def results(self):
+        """
+        Return a `list` aligned with the payloads of the bulk request of
+        the operations magento completed, with a `Fault` in place of every
+        payload which was rejected or whose operation failed, and None in
+        place of every operation still open.
+
+        Operations are matched to the request items by their
+        `operation_key`, or else by their order among the accepted items.
+        """
+        operations = sorted(
+            self.status().get('operations_list') or [],
+            key=lambda operation: int(operation.get('id') or 0)
+        )
+        request_items = self.request_items or [
+            {'id': index, 'status': 'accepted'}
+            for index in range(len(operations))
+        ]
+        accepted = [
+            item for item in request_items
+            if item.get('status') != 'rejected'
+        ]
+        if all(op.get('operation_key') is not None for op in operations):
+            by_item = dict(
+                (int(operation['operation_key']), operation)
+                for operation in operations
+            )
+        else:
+            by_item = dict(
+                (int(item['id']), operation)
+                for item, operation in zip(accepted, operations)
+            )
+        results = []
+        for item in request_items:
+            if item.get('status') == 'rejected':
+                results.append(Fault(
+                    STATUS_REJECTED,
+                    item.get('error_message') or 'Rejected by magento',
+                ))
+            else:
+                results.append(
+                    operation_result(by_item.get(int(item['id'])))
+                )
+        return results
+
+
+def operation_result(operation):
+    """
+    Return an operation of a bulk request if it completed, a `Fault` if
+    it failed or None if it is still open or unknown
+    """
+    if operation is None:
+        return None
+    status = int(operation.get('status') or 0)
+    if status == STATUS_COMPLETE:
+        return operation
+    if status == STATUS_OPEN:
+        return None
+    return Fault(
+        operation.get('error_code') or status,
+        operation.get('result_message') or '',
+    )
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+'''
+    magento.retry
+
+    Retries with exponential backoff and circuit breaking of the calls
+    made to magento
+
+    :license: BSD, see LICENSE for more details
+'''
+import random
+import socket
+import sys
+import time
+from threading import Lock
+
+if sys.version_info < (3, 0):
+    import httplib as http_client
+    from xmlrpclib import ProtocolError
+else:
+    import http.client as http_client
+    from xmlrpc.client import ProtocolError
+
+try:
+    import requests
+except ImportError:
+    requests = None
+
+from magento.metrics import record_retry
+from magento.rest import split_method
+
+#: Methods of magento resources which can safely be sent again, since
+#: they only read data or set it to given values
+IDEMPOTENT_METHODS = frozenset([
+    'info', 'list', 'search', 'items', 'tree', 'level', 'options', 'types',
+    'attributes', 'currentStore', 'assignedProducts', 'getSpecialPrice',
+    'getCarriers', 'listSuperAttributes', 'totals', 'license', 'update',
+])
+
+#: HTTP methods of REST requests which can safely be sent again
+IDEMPOTENT_VERBS = frozenset(['GET', 'PUT'])
+
+#: HTTP statuses of responses which are worth retrying
+RETRY_STATUSES = frozenset([429, 502, 503, 504])
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling magento while the circuit breaker is open
+    """
+
+
+class RetryPolicy(object):
+    """
+    Decides which failed calls are sent again, and how long to wait
+    before that.
+
+    Only errors of the connection or HTTP statuses like 502 or 503 are
+    retried, faults returned by magento are not. Calls to methods which
+    are not idempotent, like `create`, are only retried if `retry_writes`
+    is set, since a call which timed out may have been processed.
+
+    The delay before the n-th retry is picked at random between 0 and
+    `backoff * 2 ** n` seconds, bounded by `max_backoff`.
+    """
+
+    def __init__(self, max_attempts=3, backoff=0.5, max_backoff=30,
+                 jitter=True, retry_writes=False,
+                 retry_statuses=RETRY_STATUSES,
+                 idempotent_methods=IDEMPOTENT_METHODS):
+        """
+        :param max_attempts: Number of times a call is sent at most
+        :param backoff: Base delay in seconds
+        :param max_backoff: Maximum delay in seconds
+        :param jitter: If False, wait for the full delay instead of a
+                       random part of it
+        :param retry_writes: Also retry calls which are not idempotent
+        :param retry_statuses: HTTP statuses to retry
+        :param idempotent_methods: Names of the methods of magento
+                                   resources which are safe to retry
+        """
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.retry_writes = retry_writes
+        self.retry_statuses = retry_statuses
+        self.idempotent_methods = idempotent_methods
+
+    def is_idempotent(self, resource_path):
+        """
+        Check if a call to the resource path can be sent again
+
+        :param resource_path: eg: `catalog_product.info`, or a REST path
+                              optionally preceded by its HTTP method, eg:
+                              `PUT products/sku`
+        """
+        method, path = split_method(resource_path)
+        if path != resource_path:
+            return method in IDEMPOTENT_VERBS
+        if '.' not in resource_path or '/' in resource_path:
+            # REST paths without a method are read with GET
+            return True
+        return resource_path.rsplit('.', 1)[1] in self.idempotent_methods
+
+    def is_retriable(self, exc):
+        """
+        Check if the call which raised `exc` failed for a transient reason
+        """
+        if isinstance(exc, ProtocolError):
+            return exc.errcode in self.retry_statuses
+        if requests is not None and \
+                isinstance(exc, requests.RequestException):
+            if exc.response is not None:
+                return exc.response.status_code in self.retry_statuses
+            return isinstance(exc, (
+                requests.ConnectionError, requests.Timeout
+            ))
+        return isinstance(exc, (
+            socket.error, socket.timeout, http_client.HTTPException
+        ))
+
+    def delay(self, attempt):
+        """
+        Return the seconds to wait before the given retry
+        """
+        delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+        if self.jitter:
+            return random.uniform(0, delay)
+        return delay
+
+    def run(self, resource_paths, request, *args):
+        """
+        Run `request(*args)`, retrying it as the policy allows
+
+        :param resource_paths: Resource paths called by the request, more
+                               than one for a multicall
+        """
+        retry = self.retry_writes or all(
+            self.is_idempotent(resource_path)
+            for resource_path in resource_paths
+        )
+        attempt = 0
+        while True:
+            try:
+                return request(*args)
+            except Exception as exc:
+                attempt += 1
+                if not retry or attempt >= self.max_attempts or \
+                        not self.is_retriable(exc):
+                    raise
+            time.sleep(self.delay(attempt - 1))
+            record_retry()
+
+
+class CircuitBreaker(object):
+    """
+    Stops calling magento after `failure_threshold` consecutive failures,
+    so that an overloaded store is not hammered with more requests. For
+    `reset_timeout` seconds calls fail at once with
+    :class:`CircuitOpenError`, after which one call is let through to
+    probe the store. If it succeeds the breaker closes again, otherwise it
+    stays open for another `reset_timeout` seconds.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30,
+                 policy=None):
+        """
+        :param failure_threshold: Consecutive failures opening the breaker
+        :param reset_timeout: Seconds for which the breaker stays open
+        :param policy: :class:`RetryPolicy` deciding which errors count as
+                       failures of the store. By default, the errors a
+                       default policy retries.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.policy = policy or RetryPolicy()
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.lock = Lock()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def before(self):
+        """
+        Called before a request, raises :class:`CircuitOpenError` if the
+        request must not be sent
+        """
+        with self.lock:
+            if self.opened_at is None:
+                return
+            if self.probing or \
+                    time.time() - self.opened_at < self.reset_timeout:
+                raise CircuitOpenError(
+                    'Too many failures calling magento, not calling it '
+                    'for %s seconds' % self.reset_timeout
+                )
+            self.probing = True
+
+    def success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.time()
+            self.probing = False
+
+    def run(self, request, *args):
+        """
+        Run `request(*args)` unless the breaker is open
+        """
+        self.before()
+        try:
+            result = request(*args)
+        except Exception as exc:
+            if self.policy.is_retriable(exc):
+                self.failure()
+            else:
+                self.success()
+            raise
+        self.success()
+        return result
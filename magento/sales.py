@@ -8,6 +8,9 @@
     :license: BSD, see LICENSE for more details
 '''
 from .api import API
+from .columns import Columns
+from .records import OrderRecord
+from .utils import iter_pages
 
 
 class Order(API):
@@ -16,7 +19,7 @@ class Order(API):
     """
     __slots__ = ()
 
-    def list(self, filters=None):
+    def list(self, filters=None, as_records=False, as_columns=False):
         """
         Retrieve order list by filters
 
@@ -27,11 +30,37 @@ class Order(API):
                Example :
                    `{'firstname':{'ilike':'sharoon'}}`
 
+        :param as_records: Return :class:`magento.records.OrderRecord`
+                           instances instead of `dict`
+        :param as_columns: Return :class:`magento.columns.Columns`, built
+                           while the response is decoded
         :return: `list` of `dict`
         """
-        return self.call('sales_order.list', [filters])
+        if as_columns:
+            return Columns.build(self.iter_list(filters), OrderRecord)
+        orders = self.call('sales_order.list', [filters])
+        if as_records:
+            return OrderRecord.convert(orders)
+        return orders
+
+    def iter_list(self, filters=None, as_records=False):
+        """
+        Iterate over the orders matching the filters. Unlike :meth:`list`,
+        records are decoded one at a time while the response is read.
+
+        :param filters: Dictionary of filters, as for :meth:`list`
+        :param as_records: Yield :class:`magento.records.OrderRecord`
+                           instances instead of `dict`
 
-    def search(self, filters=None, fields=None, limit=None, page=1):
+        :return: iterator of `dict`
+        """
+        orders = self.iter_call('sales_order.list', [filters])
+        if as_records:
+            return OrderRecord.convert_iter(orders)
+        return orders
+
+    def search(self, filters=None, fields=None, limit=None, page=1,
+               as_records=False, as_columns=False):
         """
         Retrieve order list by options using search api. Using this result can
         be paginated
@@ -42,6 +71,11 @@ class Order(API):
         :param fields: [<String: magento field names>, ...]
         :param limit: `page limit`
         :param page: `current page`
+        :param as_records: Return :class:`magento.records.OrderRecord`
+                           instances instead of `dict`
+        :param as_columns: Return :class:`magento.columns.Columns`, built
+                           while the response is decoded. Use
+                           :meth:`search_columns` for all the pages.
 
         :return: `list` of `dict`
         """
@@ -52,28 +86,91 @@ class Order(API):
             'limit': limit or 1000,
             'page': page,
         }
-        return self.call('sales_order.search', [options])
+        if as_columns:
+            return Columns.build(
+                self.iter_call('sales_order.search', [options]),
+                OrderRecord
+            )
+        orders = self.call('sales_order.search', [options])
+        if as_records:
+            return OrderRecord.convert(orders)
+        return orders
+
+    def iter_search(self, filters=None, fields=None, page_size=1000,
+                    prefetch=False, as_records=False):
+        """
+        Iterate over all the orders matching the filters, fetching them
+        page by page with :meth:`search`. Only one page of orders is in
+        memory at a time.
+
+        :param filters: `{<attribute>:{<operator>:<value>}}`
+        :param fields: [<String: magento field names>, ...]
+        :param page_size: Number of orders fetched per call
+        :param prefetch: Fetch the next page in the background while the
+                         current page is consumed
+        :param as_records: Yield :class:`magento.records.OrderRecord`
+                           instances instead of `dict`
+
+        :return: iterator of `dict`
+        """
+        return iter_pages(
+            lambda page: self.search(
+                filters, fields, page_size, page, as_records
+            ),
+            page_size, prefetch=prefetch,
+        )
+
+    def search_columns(self, filters=None, fields=None, page_size=1000,
+                       prefetch=False):
+        """
+        Return all the orders matching the filters as
+        :class:`magento.columns.Columns`, fetched page by page like
+        :meth:`iter_search` does
 
-    def info(self, order_increment_id):
+        :param filters: `{<attribute>:{<operator>:<value>}}`
+        :param fields: [<String: magento field names>, ...]
+        :param page_size: Number of orders fetched per call
+        :param prefetch: Fetch the next page in the background while the
+                         current page is added to the columns
+        """
+        return Columns.build(
+            self.iter_search(filters, fields, page_size, prefetch),
+            OrderRecord
+        )
+
+    def info(self, order_increment_id, as_records=False):
         """
         Retrieve order info
 
         :param order_increment_id: Order ID
+        :param as_records: Return an :class:`magento.records.OrderRecord`
+                           instead of a `dict`
         """
-        return self.call(
+        order = self.call(
             'sales_order.info', [order_increment_id]
             )
+        if as_records:
+            return OrderRecord.convert(order)
+        return order
 
-    def info_multi(self, order_ids):
+    def info_multi(self, order_ids, as_records=False):
         """
         This is multicall version of 'order.info'
+
+        :param as_records: Return :class:`magento.records.OrderRecord`
+                           instances instead of `dict`
+        :return: `list` of order `dict`, with a `Fault` in place of every
+                 order magento failed to return
         """
-        return self.multiCall([
+        orders = self.multiCall([
             [
                 'sales_order.info', [order_id]
             ]
             for order_id in order_ids
         ])
+        if as_records:
+            return OrderRecord.convert(orders)
+        return orders
 
     def addcomment(self, order_increment_id,
             status, comment=None, notify=False):
@@ -140,6 +237,18 @@ class CreditMemo(API):
         """
         return self.call('sales_order_creditmemo.list', [filters])
 
+    def iter_list(self, filters=None):
+        """
+        Iterate over the credit memos matching the filters. Unlike
+        :meth:`list`, records are decoded one at a time while the response
+        is read.
+
+        :param filters: Dictionary of filters, as for :meth:`list`
+
+        :return: iterator of `dict`
+        """
+        return self.iter_call('sales_order_creditmemo.list', [filters])
+
     def info(self, creditmemo_increment_id):
         """
         Retrieve credit memo info
@@ -150,6 +259,20 @@ class CreditMemo(API):
         """
         return self.call('sales_order_creditmemo.info', [creditmemo_increment_id])
 
+    def info_multi(self, creditmemo_increment_ids):
+        """
+        Retrieve info of several credit memos in parallel
+
+        :param creditmemo_increment_ids: List of credit memo increment IDs
+
+        :return: `list` of `dict`, with the exception raised in place of
+                 every credit memo which could not be retrieved
+        """
+        return self.call_parallel([
+            ['sales_order_creditmemo.info', [creditmemo_increment_id]]
+            for creditmemo_increment_id in creditmemo_increment_ids
+        ])
+
     def create(
             self,
             order_increment_id,
@@ -251,6 +374,17 @@ class Shipment(API):
         """
         return self.call('sales_order_shipment.list', [filters])
 
+    def iter_list(self, filters=None):
+        """
+        Iterate over the shipments matching the filters. Unlike :meth:`list`,
+        records are decoded one at a time while the response is read.
+
+        :param filters: Dictionary of filters, as for :meth:`list`
+
+        :return: iterator of `dict`
+        """
+        return self.iter_call('sales_order_shipment.list', [filters])
+
     def info(self, shipment_increment_id):
         """
         Retrieve shipment info
@@ -259,6 +393,20 @@ class Shipment(API):
         """
         return self.call('sales_order_shipment.info', [shipment_increment_id])
 
+    def info_multi(self, shipment_increment_ids):
+        """
+        Retrieve info of several shipments in parallel
+
+        :param shipment_increment_ids: List of shipment IDs
+
+        :return: `list` of `dict`, with the exception raised in place of
+                 every shipment which could not be retrieved
+        """
+        return self.call_parallel([
+            ['sales_order_shipment.info', [shipment_increment_id]]
+            for shipment_increment_id in shipment_increment_ids
+        ])
+
     def create(self, order_increment_id,
             items_qty, comment=None, email=True, include_comment=False):
         """
@@ -382,6 +530,17 @@ class Invoice(API):
         """
         return self.call('sales_order_invoice.list', [filters])
 
+    def iter_list(self, filters=None):
+        """
+        Iterate over the invoices matching the filters. Unlike :meth:`list`,
+        records are decoded one at a time while the response is read.
+
+        :param filters: Dictionary of filters, as for :meth:`list`
+
+        :return: iterator of `dict`
+        """
+        return self.iter_call('sales_order_invoice.list', [filters])
+
     def info(self, invoice_increment_id):
         """
         Retrieve invoice info
@@ -392,6 +551,20 @@ class Invoice(API):
             'sales_order_invoice.info', [invoice_increment_id]
         )
 
+    def info_multi(self, invoice_increment_ids):
+        """
+        Retrieve info of several invoices in parallel
+
+        :param invoice_increment_ids: List of invoice IDs
+
+        :return: `list` of `dict`, with the exception raised in place of
+                 every invoice which could not be retrieved
+        """
+        return self.call_parallel([
+            ['sales_order_invoice.info', [invoice_increment_id]]
+            for invoice_increment_id in invoice_increment_ids
+        ])
+
     def create(self, order_increment_id, items_qty,
             comment=None, email=True, include_comment=False):
         """
@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+'''
+    magento.shard
+
+    Runs calls to magento over a pool of processes, so that decoding the
+    responses uses every CPU core instead of one
+
+    :license: BSD, see LICENSE for more details
+'''
+import multiprocessing
+import pickle
+import sys
+import zlib
+
+if sys.version_info < (3, 0):
+    import copy_reg as copyreg
+    from Queue import Empty
+else:
+    import copyreg
+    from queue import Empty
+
+from magento.api import Fault
+from magento.catalog import Product
+
+#: State of a worker process, set by :func:`init_worker`
+worker = {}
+
+
+def reduce_fault(fault):
+    # Faults do not pass their arguments to Exception, so the default
+    # pickling builds them again without arguments, which fails
+    return Fault, (fault.faultCode, fault.faultString)
+
+
+copyreg.pickle(Fault, reduce_fault)
+
+
+def id_ranges(ids, shards):
+    """
+    Split IDs into at most `shards` lists of consecutive IDs of about the
+    same length
+
+    :param ids: Iterable of integer IDs, eg: the `product_id` of the
+                records of :meth:`Product.list`
+    :param shards: Number of lists
+    """
+    ids = sorted(ids)
+    size = max(1, -(-len(ids) // shards))
+    return [ids[index:index + size] for index in range(0, len(ids), size)]
+
+
+def sku_bucket(sku, buckets):
+    """
+    Return the bucket of a SKU, which is the same in every process and
+    every run, unlike the result of `hash`
+    """
+    return (zlib.crc32(sku.encode('utf-8')) & 0xffffffff) % buckets
+
+
+def sku_buckets(skus, buckets):
+    """
+    Split SKUs into `buckets` lists by the hash of the SKU, leaving out the
+    empty lists
+    """
+    result = [[] for index in range(buckets)]
+    for sku in skus:
+        result[sku_bucket(sku, buckets)].append(sku)
+    return [bucket for bucket in result if bucket]
+
+
+def product_id_ranges(api, shards, filters=None, store_view=None):
+    """
+    Return the IDs of the products matching the filters, split by
+    :func:`id_ranges`
+    """
+    return id_ranges((
+        int(product['product_id']) for product in
+        api.get_instance_of(Product).iter_list(filters, store_view)
+    ), shards)
+
+
+class ProductInfo(object):
+    """
+    Work of a :class:`ShardedRunner` fetching the full record of every
+    product of a shard with :meth:`Product.info`, `batch_size` parallel
+    calls at a time. Products magento fails to return give the `Fault`
+    in place of their record.
+    """
+
+    def __init__(self, store_view=None, attributes=None, batch_size=100):
+        """
+        :param store_view: ID or Code of store view
+        :param attributes: List of product fields to fetch
+        :param batch_size: Number of calls made at once by a process
+        """
+        self.store_view = store_view
+        self.attributes = attributes
+        self.batch_size = batch_size
+
+    def __call__(self, api, products):
+        for index in range(0, len(products), self.batch_size):
+            results = api.call_parallel([
+                [
+                    'catalog_product.info',
+                    [product, self.store_view, self.attributes, None]
+                ]
+                for product in products[index:index + self.batch_size]
+            ])
+            for result in results:
+                if isinstance(result, Exception) and \
+                        not isinstance(result, Fault):
+                    raise result
+                yield result
+
+
+def init_worker(api_factory, work, queue, chunk_size):
+    """
+    Set up a worker process. Its API, and so its login session and its
+    connections, are created on the first shard it runs.
+    """
+    worker.update(
+        api_factory=api_factory, work=work, queue=queue,
+        chunk_size=chunk_size, api=None,
+    )
+
+
+def run_shard(index_shard):
+    """
+    Run the work on one shard in a worker process, and put its results
+    on the queue in chunks, followed by a marker telling the shard is done
+    """
+    index, shard = index_shard
+    queue = worker['queue']
+    chunk = []
+    try:
+        if worker['api'] is None:
+            worker['api'] = worker['api_factory']()
+        for result in worker['work'](worker['api'], shard):
+            chunk.append(result)
+            if len(chunk) >= worker['chunk_size']:
+                queue.put(('results', index, chunk))
+                chunk = []
+        if chunk:
+            queue.put(('results', index, chunk))
+    except Exception as exc:
+        try:
+            pickle.loads(pickle.dumps(exc))
+        except Exception:
+            exc = RuntimeError('%s: %s' % (type(exc).__name__, exc))
+        queue.put(('error', index, exc))
+    else:
+        queue.put(('done', index, None))
+
+
+class ShardedRunner(object):
+    """
+    Runs some work on shards of records, eg: ranges of product IDs, over
+    a pool of processes::
+
+        runner = ShardedRunner(
+            functools.partial(API, url, username, password),
+            ProductInfo(attributes=['sku', 'name', 'price']),
+        )
+        for product in runner.run(product_id_ranges(api, 64)):
+            ...
+
+    Every process makes its own :class:`magento.api.API` with
+    `api_factory`, so it logs in once and keeps its own connection pool.
+    Results are sent back to the parent process in chunks through a queue
+    holding at most `queue_size` chunks, so workers wait instead of
+    piling up results the parent does not consume fast enough.
+
+    The work and the factory are sent to the processes, so they must be
+    picklable, eg: functions of a module, `functools.partial` objects or
+    instances of classes like :class:`ProductInfo`.
+    """
+
+    def __init__(self, api_factory, work, processes=None, queue_size=64,
+                 chunk_size=100):
+        """
+        :param api_factory: Callable returning a new
+                            :class:`magento.api.API`
+        :param work: Callable taking an API and a shard and returning an
+                     iterable of results
+        :param processes: Number of processes, defaults to the number of
+                          CPUs
+        :param queue_size: Maximum number of chunks of results waiting
+                           for the parent process
+        :param chunk_size: Number of results sent back at once
+        """
+        self.api_factory = api_factory
+        self.work = work
+        self.processes = processes or multiprocessing.cpu_count()
+        self.queue_size = queue_size
+        self.chunk_size = chunk_size
+
+    def run(self, shards):
+        """
+        Run the work on every shard and iterate over the results as they
+        arrive, in no particular order. If the work fails on a shard, the
+        processes are stopped and the error is raised.
+
+        :param shards: Iterable of shards, eg: the lists of IDs of
+                       :func:`id_ranges` or of SKUs of :func:`sku_buckets`
+        """
+        shards = list(shards)
+        if not shards:
+            return
+        queue = multiprocessing.Queue(self.queue_size)
+        pool = multiprocessing.Pool(
+            min(self.processes, len(shards)), init_worker,
+            (self.api_factory, self.work, queue, self.chunk_size),
+        )
+        try:
+            tasks = pool.map_async(run_shard, enumerate(shards), chunksize=1)
+            pending = len(shards)
+            while pending:
+                try:
+                    kind, index, value = queue.get(timeout=0.5)
+                except Empty:
+                    if tasks.ready() and not tasks.successful():
+                        tasks.get()
+                    continue
+                if kind == 'results':
+                    for result in value:
+                        yield result
+                elif kind == 'error':
+                    raise value
+                else:
+                    pending -= 1
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
@@ -0,0 +1,350 @@
+# -*- coding: utf-8 -*-
+'''
+    magento.sync
+
+    Incremental synchronisation of records from magento
+
+    :license: BSD, see LICENSE for more details
+'''
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from threading import Lock
+
+from magento.customer import Customer
+from magento.catalog import Product
+from magento.sales import Order
+from magento.utils import write_json
+
+#: Format of the dates returned and accepted by magento
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+#: Resources which can be synchronised: the API listing them and the
+#: field holding the ID of a record
+RESOURCES = {
+    'product': (Product, 'product_id'),
+    'customer': (Customer, 'customer_id'),
+    'order': (Order, 'order_id'),
+}
+
+
+class StateFile(object):
+    """
+    JSON file holding the synchronisation state of every resource
+    """
+
+    def __init__(self, path):
+        """
+        :param path: Path of the state file
+        """
+        self.path = path
+        self.lock = Lock()
+
+    def read(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path) as fileobj:
+            return json.load(fileobj)
+
+    def get(self, resource):
+        """
+        Return the state of the resource, None if it was never synced
+        """
+        with self.lock:
+            return self.read().get(resource)
+
+    def set(self, resource, state):
+        """
+        Save the state of the resource, or remove it if `state` is None
+        """
+        with self.lock:
+            states = self.read()
+            if state is None:
+                states.pop(resource, None)
+            else:
+                states[resource] = state
+            write_json(self.path, states)
+
+
+class IncrementalSync(object):
+    """
+    Fetches only the records changed since the previous run.
+
+    For every resource the highest `updated_at` seen is kept in a state
+    file as a watermark, and the next run only asks magento for records
+    updated from that point on::
+
+        sync = IncrementalSync(client, 'magento-sync.json')
+        for product in sync.changed('product'):
+            update_local_product(product)
+
+    For resources whose list does not return `updated_at`, like products
+    in magento 1, the watermark is the time the run started, so the clock
+    of the client should be within `overlap` of the one of magento.
+
+    To not miss records saved while the previous run was listing them, or
+    stamped by a server whose clock is slightly behind, the filter starts
+    `overlap` seconds before the watermark. Records seen by the previous
+    run in that window and not updated since are not returned again.
+
+    The state is only saved once all the changed records were iterated
+    over, so an interrupted run is repeated by the next one.
+    """
+
+    def __init__(self, api, state_path, overlap=300):
+        """
+        :param api: :class:`magento.api.API` to sync from
+        :param state_path: Path of the JSON file holding the watermarks
+        :param overlap: Seconds before the watermark from which records
+                        are fetched again
+        """
+        self.api = api
+        self.state = StateFile(state_path)
+        self.overlap = timedelta(seconds=overlap)
+
+    def changed(self, resource, filters=None):
+        """
+        Iterate over the records of the resource changed since the last
+        run. On the first run, all the records are returned.
+
+        :param resource: One of 'product', 'customer' or 'order'
+        :param filters: Additional filters in the format
+                        `{<attribute>:{<operator>:<value>}}`
+        :return: iterator of `dict`
+        """
+        Klass, id_field = RESOURCES[resource]
+        state = self.state.get(resource) or {}
+        watermark = state.get('updated_at')
+        seen = set(tuple(item) for item in state.get('seen', []))
+
+        started_at = datetime.utcnow().strftime(DATETIME_FORMAT)
+        filters = dict(filters or {})
+        if watermark:
+            filters['updated_at'] = {'from': self.shift(watermark)}
+        records = self.api.get_instance_of(Klass).list(filters)
+
+        latest = watermark
+        timestamped = True
+        for record in records:
+            updated_at = record.get('updated_at')
+            if not updated_at:
+                timestamped = False
+            elif latest is None or updated_at > latest:
+                latest = updated_at
+            if (str(record[id_field]), updated_at) in seen:
+                continue
+            yield record
+
+        if latest is None or not timestamped:
+            # Lists like the one of catalog_product do not return
+            # updated_at, though they filter on it: the time the run
+            # started, in UTC like the dates of magento, is the watermark
+            latest = started_at
+        window_start = self.shift(latest)
+        self.state.set(resource, {
+            'updated_at': latest,
+            'seen': [
+                [str(record[id_field]), record.get('updated_at')]
+                for record in records
+                if record.get('updated_at') and
+                record['updated_at'] >= window_start
+            ],
+        })
+
+    def shift(self, timestamp):
+        """
+        Return the timestamp moved `overlap` seconds back
+        """
+        return (
+            datetime.strptime(timestamp, DATETIME_FORMAT) - self.overlap
+        ).strftime(DATETIME_FORMAT)
+
+    def reset(self, resource):
+        """
+        Forget the watermark of the resource, so that the next run
+        returns all its records
+        """
+        self.state.set(resource, None)
+
+
+#: Fields of a stock item compared by :class:`InventorySync`, and the
+#: function normalising their values
+STOCK_FIELDS = {
+    'qty': lambda value: round(float(value or 0), 4),
+    'is_in_stock': lambda value: int(float(value or 0)),
+}
+
+
+class InventorySync(object):
+    """
+    Pushes stock levels to magento, sending only the rows which differ
+    from what magento holds::
+
+        sync = InventorySync(client, snapshot_path='stock.json')
+        sync.push({
+            'SKU-1': {'qty': 12, 'is_in_stock': 1},
+            'SKU-2': {'qty': 0, 'is_in_stock': 0},
+        })
+
+    The current stock is read with `cataloginventory_stock_item.list`
+    calls of `chunk_size` products made in parallel, and the changed rows
+    are sent with multicalls of `cataloginventory_stock_item.update`.
+
+    With a snapshot file, the stock magento returned and the updates
+    which succeeded are saved after every push, and the next push diffs
+    against the snapshot instead of reading the stock again. Orders change
+    the stock in magento without updating the snapshot, so a snapshot is
+    only used until it is `max_age` seconds old.
+    """
+
+    def __init__(self, api, snapshot_path=None, max_age=None, key='sku',
+                 chunk_size=500, workers=None, multicall_size=None,
+                 multicall_workers=1):
+        """
+        :param api: :class:`magento.api.API` to push to
+        :param snapshot_path: Path of the JSON file holding the last known
+                              stock, None to always read it from magento
+        :param max_age: Seconds after which the snapshot is read again
+                        from magento, None to use it for ever
+        :param key: Field identifying the products, 'sku' or 'product_id'.
+                    The REST API only updates stock by SKU.
+        :param chunk_size: Number of products listed per call
+        :param workers: Number of parallel list calls, defaults to the
+                        size of the connection pool of the API
+        :param multicall_size: Number of updates per multicall
+        :param multicall_workers: Number of multicalls sent in parallel
+        """
+        self.api = api
+        self.snapshot_path = snapshot_path
+        self.max_age = max_age
+        self.key = key
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.multicall_size = multicall_size
+        self.multicall_workers = multicall_workers
+
+    def normalize(self, data):
+        """
+        Return the compared fields of a stock item with comparable values
+        """
+        return dict(
+            (field, convert(data[field]))
+            for field, convert in STOCK_FIELDS.items() if field in data
+        )
+
+    def product_key(self, value):
+        return self.key == 'product_id' and int(value) or str(value)
+
+    def fetch(self, products):
+        """
+        Return the current stock of the products in magento, by product.
+        Products magento does not know are left out.
+        """
+        products = list(products)
+        results = self.api.call_parallel([
+            [
+                'cataloginventory_stock_item.list',
+                [products[index:index + self.chunk_size]]
+            ]
+            for index in range(0, len(products), self.chunk_size)
+        ], self.workers)
+        stock = {}
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+            for item in result:
+                stock[self.product_key(item[self.key])] = \
+                    self.normalize(item)
+        return stock
+
+    def read_snapshot(self):
+        """
+        Return the stock saved in the snapshot and the time it was read
+        from magento, or None if there is no snapshot or it is too old
+        """
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return None
+        with open(self.snapshot_path) as fileobj:
+            snapshot = json.load(fileobj)
+        if self.max_age is not None and \
+                time.time() - snapshot['taken_at'] > self.max_age:
+            return None
+        return dict(
+            (self.product_key(product), data)
+            for product, data in snapshot['stock'].items()
+        ), snapshot['taken_at']
+
+    def write_snapshot(self, stock, taken_at):
+        if not self.snapshot_path:
+            return
+        write_json(self.snapshot_path, {
+            'taken_at': taken_at,
+            'stock': dict(
+                ('%s' % product, data) for product, data in stock.items()
+            ),
+        })
+
+    def current(self, products):
+        """
+        Return the current stock of the products, from the snapshot when
+        it is fresh enough and holds them, from magento otherwise, and the
+        time it was read at
+        """
+        products = [self.product_key(product) for product in products]
+        snapshot = self.read_snapshot()
+        if snapshot is not None:
+            stock, taken_at = snapshot
+            missing = [
+                product for product in products if product not in stock
+            ]
+        else:
+            stock, taken_at, missing = {}, time.time(), products
+        if missing:
+            stock.update(self.fetch(missing))
+        return stock, taken_at
+
+    def diff(self, desired, stock):
+        """
+        Return the `(product, data)` pairs of the products whose desired
+        stock differs from `stock`, or which are not in `stock`
+
+        :param desired: `dict` of the desired stock data by product, eg:
+                        `{'SKU-1': {'qty': 12, 'is_in_stock': 1}}`
+        :param stock: `dict` of the current stock by product
+        """
+        changes = []
+        for product, data in desired.items():
+            current = stock.get(self.product_key(product))
+            wanted = self.normalize(data)
+            if current is None or any(
+                    current.get(field) != value
+                    for field, value in wanted.items()):
+                changes.append((product, data))
+        return changes
+
+    def push(self, desired):
+        """
+        Send the stock data of the products whose stock changed
+
+        :param desired: `dict` of the desired stock data by product, eg:
+                        `{'SKU-1': {'qty': 12, 'is_in_stock': 1}}`
+        :return: `dict` of the results of the updates sent by product, with
+                 a `Fault` in place of every update magento failed
+        """
+        stock, taken_at = self.current(desired)
+        changes = self.diff(desired, stock)
+        results = self.api.multiCall([
+            ['cataloginventory_stock_item.update', [product, data]]
+            for product, data in changes
+        ], self.multicall_size, self.multicall_workers) if changes else []
+        for (product, data), result in zip(changes, results):
+            if result and not isinstance(result, Exception):
+                stock.setdefault(self.product_key(product), {}).update(
+                    self.normalize(data)
+                )
+        self.write_snapshot(stock, taken_at)
+        return dict(
+            (product, result)
+            for (product, data), result in zip(changes, results)
+        )
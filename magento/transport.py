@@ -0,0 +1,434 @@
+# -*- coding: utf-8 -*-
+'''
+    magento.transport
+
+    Persistent, thread safe HTTP transport for the xmlrpc protocol
+
+    :license: BSD, see LICENSE for more details
+'''
+import errno
+import socket
+import ssl
+import sys
+import time
+import zlib
+from threading import Condition, Lock
+
+if sys.version_info < (3, 0):
+    import httplib as http_client
+    from xmlrpclib import Transport, ProtocolError
+    from xmlrpclib import ExpatParser, Unmarshaller
+else:
+    import http.client as http_client
+    from xmlrpc.client import Transport, ProtocolError
+    from xmlrpc.client import ExpatParser, Unmarshaller
+
+from magento.codec import Codec
+from magento.metrics import record_exchange
+
+
+#: Socket errors which tell that a kept alive connection was closed by
+#: the server in between two requests.
+STALE_CONNECTION_ERRORS = (errno.ECONNRESET, errno.ECONNABORTED, errno.EPIPE)
+
+
+class HTTPSConnection(http_client.HTTPSConnection):
+    """
+    HTTPS connection which resumes the TLS session of the pool it
+    belongs to, so that only the first connection to a host pays for a
+    full TLS handshake.
+    """
+
+    def __init__(self, host, pool, timeout=None, context=None):
+        http_client.HTTPSConnection.__init__(
+            self, host, timeout=timeout, context=context
+        )
+        self.pool = pool
+        self.ssl_context = context or ssl.create_default_context()
+
+    def connect(self):
+        if self._tunnel_host or not hasattr(ssl, 'SSLSession'):
+            return http_client.HTTPSConnection.connect(self)
+        sock = socket.create_connection(
+            (self.host, self.port), self.timeout, self.source_address
+        )
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock = self.ssl_context.wrap_socket(
+            sock, server_hostname=self.host, session=self.pool.tls_session
+        )
+
+
+class ConnectionPool(object):
+    """
+    A bounded pool of keep alive connections to a single host.
+
+    At most `maxsize` connections are open at any time. A thread asking
+    for a connection when all of them are in use waits for one to be
+    returned to the pool. Connections idle for longer than
+    `idle_timeout` seconds are closed instead of being reused.
+    """
+
+    def __init__(self, host, secure=False, maxsize=10, idle_timeout=60,
+                 timeout=None, ssl_context=None):
+        """
+        :param host: host[:port] to connect to
+        :param secure: use HTTPS if True
+        :param maxsize: maximum number of connections
+        :param idle_timeout: seconds after which an idle connection is
+                             closed
+        :param timeout: socket timeout of the connections
+        :param ssl_context: `ssl.SSLContext` for HTTPS connections. A
+                            default one is made otherwise, shared by the
+                            connections of the pool since a TLS session
+                            can only be resumed with the context that
+                            created it.
+        """
+        self.host = host
+        self.secure = secure
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        if secure and ssl_context is None:
+            ssl_context = ssl.create_default_context()
+        self.ssl_context = ssl_context
+        self.tls_session = None
+        self._idle = []
+        self._size = 0
+        self._condition = Condition(Lock())
+
+    def _new_connection(self):
+        if self.secure:
+            return HTTPSConnection(
+                self.host, self, timeout=self.timeout,
+                context=self.ssl_context,
+            )
+        return http_client.HTTPConnection(self.host, timeout=self.timeout)
+
+    def get(self):
+        """
+        Return an idle connection, or a new one if the pool is not full
+        yet. Blocks while all the connections are in use.
+        """
+        expired = []
+        with self._condition:
+            while True:
+                now = time.time()
+                while self._idle and \
+                        now - self._idle[0][1] > self.idle_timeout:
+                    expired.append(self._idle.pop(0)[0])
+                    self._size -= 1
+                if self._idle:
+                    connection = self._idle.pop()[0]
+                    break
+                if self._size < self.maxsize:
+                    self._size += 1
+                    connection = None
+                    break
+                self._condition.wait()
+        for stale in expired:
+            stale.close()
+        return connection or self._new_connection()
+
+    def put(self, connection):
+        """
+        Return a connection which can be reused to the pool
+        """
+        if self.secure and connection.sock is not None:
+            # TLS 1.3 sends the session ticket after the handshake, so the
+            # session is only worth keeping once a response was read
+            self.tls_session = getattr(
+                connection.sock, 'session', self.tls_session
+            )
+        with self._condition:
+            self._idle.append((connection, time.time()))
+            self._condition.notify()
+
+    def discard(self, connection):
+        """
+        Close a connection which cannot be reused and free its place in
+        the pool
+        """
+        connection.close()
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+    def close(self):
+        """
+        Close all the idle connections
+        """
+        with self._condition:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._condition.notify_all()
+        for connection, last_used in idle:
+            connection.close()
+
+
+class StreamingUnmarshaller(Unmarshaller):
+    """
+    Unmarshaller from which the elements of the array returned by an
+    xmlrpc call can be taken as soon as they are parsed.
+
+    The unmarshaller keeps the values parsed so far on a stack, with the
+    positions on the stack where the open arrays and structs start in
+    `_marks`. Once parsed, the elements of the returned array lie between
+    the first mark and the next one.
+    """
+    #: Type of the value returned, 'array' or 'struct'
+    returned = None
+
+    def start(self, tag, attrs):
+        if not self._marks and tag in ('array', 'struct'):
+            self.returned = tag
+        Unmarshaller.start(self, tag, attrs)
+
+    def pop_items(self):
+        """
+        Remove the elements of the returned array parsed so far from the
+        stack and return them
+        """
+        if self.returned != 'array' or not self._marks:
+            return []
+        start = self._marks[0]
+        end = len(self._marks) > 1 and self._marks[1] or len(self._stack)
+        items = self._stack[start:end]
+        if items:
+            del self._stack[start:end]
+            self._marks[1:] = [
+                mark - len(items) for mark in self._marks[1:]
+            ]
+        return items
+
+
+def iter_array(response, use_datetime=False, chunk_size=65536):
+    """
+    Parse an xmlrpc response incrementally and yield the elements of the
+    array it returns. A fault returned instead is raised as a `Fault`.
+
+    :param response: File like HTTP response
+    :param use_datetime: see `xmlrpclib.Transport`
+    :param chunk_size: Bytes read from the response at once
+    """
+    unmarshaller = StreamingUnmarshaller(use_datetime)
+    parser = ExpatParser(unmarshaller)
+    decompressor = None
+    if response.getheader('Content-Encoding', '') == 'gzip':
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    while True:
+        data = response.read(chunk_size)
+        if not data:
+            break
+        if decompressor is not None:
+            data = decompressor.decompress(data)
+        parser.feed(data)
+        for item in unmarshaller.pop_items():
+            yield item
+    parser.close()
+    for value in unmarshaller.close():
+        if isinstance(value, list):
+            for item in value:
+                yield item
+        else:
+            yield value
+
+
+class PooledTransport(Transport):
+    """
+    xmlrpc transport which keeps connections alive in a
+    :class:`ConnectionPool` per host.
+
+    Unlike the transports of the standard library, a single instance can
+    be used by several threads at the same time. This allows the
+    ServerProxy of an :class:`magento.api.API` to be shared by all the
+    sub APIs and threads using it.
+    """
+
+    def __init__(self, secure=False, pool_maxsize=10, pool_idle_timeout=60,
+                 timeout=None, ssl_context=None, use_datetime=False,
+                 codec=None):
+        """
+        :param secure: connect using HTTPS
+        :param pool_maxsize: maximum number of connections per host
+        :param pool_idle_timeout: seconds after which an idle connection
+                                  is closed
+        :param timeout: socket timeout in seconds
+        :param ssl_context: `ssl.SSLContext` used for HTTPS connections
+        :param use_datetime: see `xmlrpclib.Transport`
+        :param codec: :class:`magento.codec.Codec` decoding the responses,
+                      and encoding the requests when used with
+                      :class:`magento.codec.ServerProxy`
+        """
+        Transport.__init__(self, use_datetime)
+        self.codec = codec or Codec(use_datetime)
+        # Read by parse_response, kept off since instances are shared
+        self.verbose = False
+        self.secure = secure
+        self.pool_maxsize = pool_maxsize
+        self.pool_idle_timeout = pool_idle_timeout
+        self.timeout = timeout
+        self.ssl_context = ssl_context
+        self._pools = {}
+        self._pools_lock = Lock()
+
+    def get_pool(self, host):
+        """
+        Return the connection pool for the given host
+        """
+        with self._pools_lock:
+            pool = self._pools.get(host)
+            if pool is None:
+                pool = self._pools[host] = ConnectionPool(
+                    host, self.secure, self.pool_maxsize,
+                    self.pool_idle_timeout, self.timeout, self.ssl_context,
+                )
+            return pool
+
+    def open(self, host, handler, request_body, verbose=False):
+        """
+        Send the xmlrpc request over a pooled connection and return the
+        pool, the connection and the response. The request is sent again
+        on a new connection if the server closed the kept alive one.
+        """
+        host, extra_headers, x509 = self.get_host_info(host)
+        pool = self.get_pool(host)
+        for attempt in (0, 1):
+            connection = pool.get()
+            reused = connection.sock is not None
+            try:
+                return pool, connection, self.send(
+                    connection, handler, request_body, extra_headers, verbose
+                )
+            except Exception as exc:
+                # Any error leaves the connection in an unknown state, and
+                # it must be discarded to free its place in the pool
+                pool.discard(connection)
+                if attempt or not reused or not self.is_stale(exc):
+                    raise
+
+    @staticmethod
+    def release(pool, connection, response):
+        """
+        Give the connection back to the pool if the response was read
+        entirely, close it otherwise
+        """
+        if response.isclosed():
+            pool.put(connection)
+        else:
+            pool.discard(connection)
+
+    def request(self, host, handler, request_body, verbose=False):
+        pool, connection, response = self.open(
+            host, handler, request_body, verbose
+        )
+        try:
+            result = self.read_response(host, handler, response)
+            record_exchange(
+                len(request_body),
+                int(response.getheader('Content-Length') or 0),
+            )
+            return result
+        finally:
+            self.release(pool, connection, response)
+
+    def stream(self, host, handler, request_body, verbose=False):
+        """
+        Send the xmlrpc request and return an iterator over the elements
+        of the array it returns, which are parsed as the response is read.
+        Only one element at a time is kept in memory, instead of the whole
+        response.
+
+        The connection goes back to the pool once the iterator is
+        exhausted, and is closed if the iterator is dropped before.
+        """
+        pool, connection, response = self.open(
+            host, handler, request_body, verbose
+        )
+        try:
+            self.check_status(host, handler, response)
+        except Exception:
+            self.release(pool, connection, response)
+            raise
+        return self.iter_response(
+            pool, connection, response, len(request_body)
+        )
+
+    def iter_response(self, pool, connection, response, request_size):
+        """
+        Yield the elements of the array of a response opened by
+        :meth:`stream`
+        """
+        try:
+            for item in iter_array(response, self._use_datetime):
+                yield item
+            record_exchange(
+                request_size,
+                int(response.getheader('Content-Length') or 0),
+            )
+        finally:
+            self.release(pool, connection, response)
+
+    @staticmethod
+    def is_stale(exc):
+        """
+        Check if the exception means that the server closed a kept alive
+        connection, in which case the request can safely be sent again.
+        """
+        if isinstance(exc, http_client.BadStatusLine):
+            return True
+        return getattr(exc, 'errno', None) in STALE_CONNECTION_ERRORS
+
+    def send(self, connection, handler, request_body, extra_headers,
+             verbose=False):
+        """
+        Send the xmlrpc request over the connection and return the
+        response
+        """
+        if verbose:
+            connection.set_debuglevel(1)
+        connection.putrequest('POST', handler, skip_accept_encoding=True)
+        connection.putheader('User-Agent', self.user_agent)
+        connection.putheader('Content-Type', 'text/xml')
+        connection.putheader('Accept-Encoding', 'gzip')
+        connection.putheader('Content-Length', str(len(request_body)))
+        for key, value in extra_headers or []:
+            connection.putheader(key, value)
+        connection.endheaders(request_body)
+        return connection.getresponse()
+
+    def check_status(self, host, handler, response):
+        """
+        Raise `ProtocolError` if the HTTP request failed
+        """
+        if response.status != 200:
+            response.read()
+            raise ProtocolError(
+                host + handler, response.status, response.reason,
+                response.msg,
+            )
+
+    def read_response(self, host, handler, response):
+        """
+        Parse the xmlrpc response, or raise `ProtocolError` if the HTTP
+        request failed
+        """
+        self.check_status(host, handler, response)
+        return self.parse_response(response)
+
+    def parse_response(self, response):
+        """
+        Decode the response with the codec of the transport
+        """
+        data = response.read()
+        if response.getheader('Content-Encoding', '') == 'gzip':
+            data = zlib.decompress(data, 16 + zlib.MAX_WBITS)
+        return self.codec.loads(data)
+
+    def close(self):
+        """
+        Close the idle connections of every pool
+        """
+        with self._pools_lock:
+            pools = list(self._pools.values())
+        for pool in pools:
+            pool.close()
@@ -6,8 +6,24 @@
 
     :license: BSD, see LICENSE for more details
 '''
+import json
+import os
 import re
 
+from concurrent.futures import ThreadPoolExecutor
+
+replace_file = getattr(os, 'replace', os.rename)
+
+
+def write_json(path, data):
+    """
+    Write `data` as JSON to the file at `path`, through a temporary file
+    which replaces it, so that the file is never left half written
+    """
+    with open(path + '.tmp', 'w') as fileobj:
+        json.dump(data, fileobj)
+    replace_file(path + '.tmp', path)
+
 
 def expand_url(url, protocol):
     """
@@ -30,3 +46,51 @@ def camel_2_snake(name):
     "Converts CamelCase to camel_case"
     s1 = re.sub('(.)([A-Z][a-z]+)', r'\1_\2', name)
     return re.sub('([a-z0-9])([A-Z])', r'\1_\2', s1).lower()
+
+
+def iter_pages(fetch_page, page_size, start=1, prefetch=False,
+               total=None):
+    """
+    Iterate over the records of a paginated API one page at a time, so
+    that only the current page is held in memory. Iteration stops on the
+    first page which has less than `page_size` records, or once `total`
+    records were fetched.
+
+    :param fetch_page: Callable which takes a page number and returns the
+                       list of records in that page
+    :param page_size: Number of records in a full page
+    :param start: Number of the first page
+    :param prefetch: If True, the next page is fetched in a background
+                     thread while the records of the current page are
+                     being consumed
+    :param total: Callable returning the number of records of all the
+                  pages, or None while it is not known. It is called
+                  after every page, so `fetch_page` can learn it from the
+                  first response.
+    """
+    executor = prefetch and ThreadPoolExecutor(max_workers=1) or None
+    try:
+        page = start
+        fetched = 0
+        records = fetch_page(page)
+        while True:
+            fetched += len(records)
+            has_next = len(records) >= page_size
+            if has_next and total is not None:
+                count = total()
+                has_next = count is None or fetched < count
+            if has_next and executor is not None:
+                next_records = executor.submit(fetch_page, page + 1)
+            for record in records:
+                yield record
+            if not has_next:
+                return
+            page += 1
+            records = None
+            if executor is not None:
+                records = next_records.result()
+            else:
+                records = fetch_page(page)
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False)
@@ -25,7 +25,14 @@ setup(
     platforms='any',
     install_requires=[
         'suds-jurko>=0.6',
+        'futures; python_version < "3"',
     ],
+    extras_require={
+        'lxml': ['lxml'],
+        'numpy': ['numpy'],
+        'arrow': ['pyarrow'],
+        'aio': ['aiohttp; python_version >= "3.5"'],
+    },
     classifiers=[
         'Development Status :: 6 - Mature',
         'Environment :: Web Environment',